@@ -0,0 +1,276 @@
+import asyncio
+import aiohttp
+import pandas as pd
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import parse_lxml
+from player_cache import PlayerCache, map_stats, map_bias, CACHE_PATH
+from storage import RowSink, PMR_COLUMNS, OFC_COLUMNS
+from seen_index import SeenIndex
+from stats_store import open_store
+
+# asyncio crawler, the /match listing poll, match pages and player profiles
+# are all fetched at the same time over plain http (no browser):
+#
+#   listing poller --match_queue--> match workers --player_queue--> player workers
+#
+# the queues are bounded, so a slow stage makes the one before it wait
+# instead of piling up pages in memory. every request goes through one
+# token bucket so the whole crawler stays under RATE requests per second.
+# the player cache, csv sinks and stats store are only touched from one disk
+# thread, so sqlite and fsync never block the event loop
+#
+# a match is only written (and marked scraped) once every player on its
+# scoreboard resolved. over plain http the maps tab is only there if the site
+# renders it into the profile html, a profile without it counts as failed and
+# the match is left for deep_scraper.py
+#
+# usage: python async_crawler.py [base_url]
+#   base_url defaults to csstats.gg, point it at a local server to replay saved pages
+
+BASE_URL = "https://csstats.gg"
+
+# requests per second allowed by the site, and how many can go out at once after idling
+RATE = 2.0
+BURST = 5
+
+# open connections kept alive to the host
+CONNECTIONS = 8
+
+# seconds between polls of the listing, None polls forever
+POLL_INTERVAL = 5
+POLLS = None
+
+MATCH_WORKERS = 2
+PLAYER_WORKERS = 6
+
+MATCH_QUEUE = 20
+PLAYER_QUEUE = 50
+
+# attempts per page before giving up on it
+RETRIES = 3
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+
+PMR_PATH = 'data/matches_pmr_2.csv'
+OFC_PATH = 'data/matches_ofc_2.csv'
+STATS_PATH = 'data/stats_pmr.csv'
+STORE_PATH = 'data/stats_pmr'
+
+SEEN_PATH = 'data/seen_matches.bin'
+SCRAPED_PATH = 'data/seen_stats_pmr.bin'
+
+
+# -- RATE LIMITING -- #
+
+class TokenBucket():
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = None
+        self.lock = asyncio.Lock()
+
+    # waits until a request is allowed
+    async def take(self):
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Crawler():
+    def __init__(self, session, bucket, cache, disk, base_url=BASE_URL):
+        self.base_url = base_url
+        self.session = session
+        self.bucket = bucket
+        self.cache = cache
+        self.disk = disk
+
+        self.match_queue = asyncio.Queue(MATCH_QUEUE)
+        self.player_queue = asyncio.Queue(PLAYER_QUEUE)
+
+        # match_id -> [winner, map, players_stats, players left, players failed]
+        self.in_flight = {}
+
+        # same indexes as scraper.py and deep_scraper.py
+        self.seen = SeenIndex(SEEN_PATH, seed_csvs=[PMR_PATH, OFC_PATH])
+        self.scraped = SeenIndex(SCRAPED_PATH, seed_csvs=[STATS_PATH])
+
+        self.sinks = {
+            PMR_PATH: RowSink(PMR_PATH, PMR_COLUMNS, seen=self.seen),
+            OFC_PATH: RowSink(OFC_PATH, OFC_COLUMNS, seen=self.seen),
+        }
+        self.store = open_store(STORE_PATH, STATS_PATH, seen=self.scraped)
+
+    async def fetch(self, url):
+        for attempt in range(RETRIES):
+            await self.bucket.take()
+            try:
+                async with self.session.get(url) as response:
+                    response.raise_for_status()
+                    return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"{url} failed ({e}), attempt {attempt + 1}/{RETRIES}")
+                await asyncio.sleep(2 ** attempt)
+
+        return None
+
+    # runs blocking disk work (sqlite, csv and store appends) on the disk thread
+    async def io(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.disk, fn, *args)
+
+    async def append(self, path, row):
+        await self.io(self.sinks[path].write, row)
+
+    # -- STAGES -- #
+
+    async def poll_listing(self):
+        polls = 0
+        while POLLS is None or polls < POLLS:
+            polls += 1
+
+            page = await self.fetch(self.base_url + "/match")
+            if page is not None:
+                for match in parse_lxml.parse_listing(page, skip=lambda id: id in self.seen):
+                    self.seen.add(match['match_id'])
+                    match['date'] = pd.to_datetime('now')
+
+                    if 'premiere_rating' in match:
+                        await self.append(PMR_PATH, match)
+
+                        # waits here when the match workers are behind
+                        if match['match_id'] not in self.scraped:
+                            await self.match_queue.put(match['match_id'])
+                    else:
+                        await self.append(OFC_PATH, match)
+
+            print("reloading page. . .")
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def match_worker(self):
+        while True:
+            id = await self.match_queue.get()
+            try:
+                page = await self.fetch(f"{self.base_url}/match/{id}")
+                if page is None:
+                    continue
+
+                winner, match_map, player_links = parse_lxml.parse_match(page)
+                print(f"WINNER = {winner}")
+                self.in_flight[id] = [winner, match_map, [None]*10, len(player_links), 0]
+
+                for index, link in enumerate(player_links):
+                    profile = await self.io(self.cache.get, link)
+                    if profile is None:
+                        await self.player_queue.put((id, index, link.replace("https://csstats.gg", self.base_url)))
+                    else:
+                        await self.player_done(id, index, profile)
+
+                if not player_links:
+                    await self.player_done(id, None, None)
+
+            except Exception as e:
+                print(f"match {id} could not be parsed ({e})")
+            finally:
+                self.match_queue.task_done()
+
+    async def player_worker(self):
+        while True:
+            id, index, link = await self.player_queue.get()
+            profile = None
+            try:
+                page = await self.fetch(link)
+                if page is None:
+                    print(f"player {link} could not be loaded")
+                else:
+                    profile = (parse_lxml.parse_profile(page), parse_lxml.parse_maps(page))
+                    if not profile[1]:
+                        print(f"player {link} has no maps tab in the profile html")
+                        profile = None
+                    else:
+                        await self.io(self.cache.put, link, *profile)
+
+            except Exception as e:
+                print(f"player {link} could not be parsed ({e})")
+                profile = None
+            finally:
+                await self.player_done(id, index, profile)
+                self.player_queue.task_done()
+
+    # fills in one player (profile None = failed) and writes the match once
+    # all of them are in, unless one of them failed
+    async def player_done(self, id, index, profile):
+        state = self.in_flight[id]
+        winner, match_map, players_stats = state[:3]
+
+        if index is not None:
+            if profile is not None:
+                stats, map_table = profile
+                players_stats[index] = stats + list(map_stats(map_table, match_map))
+            else:
+                state[4] += 1
+            state[3] -= 1
+
+        if state[3] <= 0:
+            del self.in_flight[id]
+
+            if state[4]:
+                print(f"match {id} not saved, {state[4]} players could not be loaded")
+                return
+
+            self.scraped.add(id)
+            await self.io(self.store.append, id, map_bias.get(match_map), players_stats, winner)
+
+    async def run(self):
+        workers = [asyncio.create_task(self.match_worker()) for _ in range(MATCH_WORKERS)]
+        workers += [asyncio.create_task(self.player_worker()) for _ in range(PLAYER_WORKERS)]
+
+        await self.poll_listing()
+
+        # lets the queued matches finish when the poll count runs out
+        await self.match_queue.join()
+        await self.player_queue.join()
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def close(self):
+        for sink in self.sinks.values():
+            await self.io(sink.close)
+
+
+async def main(base_url=BASE_URL, cache_path=CACHE_PATH):
+    # one thread for all disk work, the sqlite connection lives in it
+    disk = ThreadPoolExecutor(max_workers=1)
+    cache = await asyncio.get_running_loop().run_in_executor(disk, PlayerCache, cache_path)
+
+    connector = aiohttp.TCPConnector(limit_per_host=CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=30)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+        crawler = Crawler(session, TokenBucket(RATE, BURST), cache, disk, base_url)
+        try:
+            await crawler.run()
+        finally:
+            await crawler.close()
+
+    print(f"player cache hits | misses : {cache.hits} | {cache.misses}")
+    await asyncio.get_running_loop().run_in_executor(disk, cache.close)
+    disk.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1].rstrip('/') if len(sys.argv) > 1 else BASE_URL))
+    print("Session Completed")
@@ -0,0 +1,274 @@
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse
+from functools import partial
+from time import perf_counter
+from lxml import html
+import pandas as pd
+import threading
+import json
+import sys
+import os
+
+import parse_selenium
+import parse_lxml
+from driver_factory import make_driver, accept_cookies, wait_for
+
+# offline parsing benchmark, replays csstats.gg pages saved to disk so the
+# extraction code can be timed (and checked) without the live site
+#
+#   lxml     - parse_lxml.py on the saved html
+#   selenium - parse_selenium.py on the same pages served by a local http stub
+#
+# every parsed value is compared with the golden.csv next to the pages, a
+# change in the output fails the run just like a slowdown shows in the timings
+#
+# pages recorded from the live site go to benchmark/fixtures. until there are
+# any, the hand written pages of tests/fixtures are replayed, their golden.csv
+# is checked by hand against the pages
+#
+# usage:
+#   python benchmark.py --record [matches]   saves the listing and a few matches with their players
+#   python benchmark.py [lxml|selenium]      replays the saved pages (both backends by default)
+#   python benchmark.py --golden             rewrites golden.csv from the selenium output, the
+#                                            backend the lxml one has to agree with
+
+LINK = "https://csstats.gg/match"
+
+# recorded pages, and the hand written ones replayed when nothing is recorded
+FIXTURES_PATH = 'benchmark/fixtures'
+SHIPPED_PATH = 'tests/fixtures'
+MANIFEST = 'manifest.json'
+GOLDEN = 'golden.csv'
+OUTPUT_PATH = 'output/benchmark-output.csv'
+
+# matches saved by --record, and players saved per match
+RECORD_MATCHES = 5
+RECORD_PLAYERS = 4
+
+# times every page is parsed, the driver backend is a lot slower
+REPEAT = {"lxml": 50, "selenium": 3}
+
+STUB_PORT = 8070
+
+# page kind -> (lxml parser, selenium parser, elements to wait for)
+PARSERS = {
+    "listing": (parse_lxml.parse_listing, parse_selenium.parse_listing, parse_selenium.LISTING_WAIT),
+    "match": (parse_lxml.parse_match, parse_selenium.parse_match, parse_selenium.MATCH_WAIT),
+    "profile": (parse_lxml.parse_profile, parse_selenium.parse_profile, parse_selenium.PROFILE_WAIT),
+    "maps": (parse_lxml.parse_maps, parse_selenium.parse_maps, parse_selenium.MAPS_WAIT),
+}
+
+
+# -- RECORDING -- #
+
+# page html without scripts, so the stub replays the page as it was rendered
+def snapshot(driver):
+    tree = html.fromstring(driver.page_source)
+    for script in tree.xpath('//script'):
+        script.drop_tree()
+    return html.tostring(tree, encoding='unicode')
+
+
+def record(matches=RECORD_MATCHES):
+    os.makedirs(FIXTURES_PATH, exist_ok=True)
+    manifest = []
+
+    def save(kind, name, url, wait):
+        wait_for(driver, wait)
+        with open(os.path.join(FIXTURES_PATH, name), 'w', encoding='utf-8') as f:
+            f.write(snapshot(driver))
+        manifest.append({'kind': kind, 'file': name, 'url': url})
+        print(f"saved {name}")
+
+    driver = make_driver("lean")
+    try:
+        driver.get(LINK)
+        accept_cookies(driver)
+        save("listing", "listing.html", LINK, parse_selenium.LISTING_WAIT)
+
+        listing = parse_lxml.parse_listing(driver.page_source)
+        for match in listing[:matches]:
+            id = match['match_id']
+            url = LINK + "/" + str(id)
+            driver.get(url)
+            save("match", f"match_{id}.html", url, parse_selenium.MATCH_WAIT)
+
+            _, _, player_links = parse_lxml.parse_match(driver.page_source)
+            for index, link in enumerate(player_links[:RECORD_PLAYERS]):
+                driver.get(link)
+                save("profile", f"profile_{id}_{index}.html", link, parse_selenium.PROFILE_WAIT)
+                driver.get(link + "#/maps")
+                save("maps", f"maps_{id}_{index}.html", link + "#/maps", parse_selenium.MAPS_WAIT)
+
+    finally:
+        driver.quit()
+
+    with open(os.path.join(FIXTURES_PATH, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    print(f"{len(manifest)} pages saved to {FIXTURES_PATH}")
+
+
+# -- OUTPUT ROWS -- #
+
+# parse results -> comparable rows. links are compared by path, the stub
+# serves the pages from another host than the one they were saved from
+def link_path(link):
+    return urlparse(link).path.rstrip('/')
+
+
+def rows(kind, result):
+    if kind == "listing":
+        return [json.dumps(match, sort_keys=True) for match in result]
+    if kind == "match":
+        winner, match_map, player_links = result
+        return [json.dumps([winner, match_map, [link_path(link) for link in player_links]])]
+    if kind == "profile":
+        return [json.dumps(result)]
+    return [json.dumps([map, *value]) for map, value in sorted(result.items())]
+
+
+# -- BACKENDS -- #
+
+# directory of the pages to replay, the recorded ones when there are any
+def pages_path():
+    if os.path.exists(os.path.join(FIXTURES_PATH, MANIFEST)):
+        return FIXTURES_PATH
+    return SHIPPED_PATH
+
+
+def load_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+# (kind, file) -> parsed rows, and [kind, pages, rows, seconds] totals
+def run_lxml(path, manifest):
+    output = {}
+    totals = {}
+    repeat = REPEAT["lxml"]
+
+    for page in manifest:
+        with open(os.path.join(path, page['file']), encoding='utf-8') as f:
+            source = f.read()
+        parser = PARSERS[page['kind']][0]
+
+        start = perf_counter()
+        for _ in range(repeat):
+            result = parser(source)
+        seconds = perf_counter() - start
+
+        output[(page['kind'], page['file'])] = rows(page['kind'], result)
+        add(totals, page['kind'], repeat, repeat*len(output[(page['kind'], page['file'])]), seconds)
+
+    return output, totals
+
+
+def run_selenium(path, manifest):
+    output = {}
+    totals = {}
+    repeat = REPEAT["selenium"]
+
+    handler = partial(QuietHandler, directory=path)
+    server = ThreadingHTTPServer(('127.0.0.1', STUB_PORT), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    driver = make_driver("lean")
+
+    try:
+        for page in manifest:
+            parser, wait = PARSERS[page['kind']][1:]
+            driver.get(f"http://127.0.0.1:{STUB_PORT}/{page['file']}")
+            wait_for(driver, wait)
+
+            start = perf_counter()
+            for _ in range(repeat):
+                result = parser(driver)
+            seconds = perf_counter() - start
+
+            output[(page['kind'], page['file'])] = rows(page['kind'], result)
+            add(totals, page['kind'], repeat, repeat*len(output[(page['kind'], page['file'])]), seconds)
+
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    return output, totals
+
+
+def add(totals, kind, pages, rows, seconds):
+    total = totals.setdefault(kind, [0, 0, 0.0])
+    total[0] += pages
+    total[1] += rows
+    total[2] += seconds
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+# -- GOLDEN OUTPUT -- #
+
+def to_frame(output):
+    return pd.DataFrame(
+        [[kind, file, i, row] for (kind, file), page_rows in output.items() for i, row in enumerate(page_rows)],
+        columns=['kind', 'file', 'row', 'value']
+    )
+
+
+# kind -> number of rows that differ from the golden output
+def compare(output, golden):
+    frame = to_frame(output).merge(golden, on=['kind', 'file', 'row'], how='outer', suffixes=('', '_golden'))
+    return (frame['value'] != frame['value_golden']).groupby(frame['kind']).sum().to_dict()
+
+
+# -- RUN -- #
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    if args and args[0] == "--record":
+        record(int(args[1]) if len(args) > 1 else RECORD_MATCHES)
+        sys.exit()
+
+    path = pages_path()
+    manifest = load_manifest(path)
+    golden_path = os.path.join(path, GOLDEN)
+    print(f"replaying {len(manifest)} pages from {path}")
+
+    if args and args[0] == "--golden":
+        output, _ = run_selenium(path, manifest)
+        to_frame(output).to_csv(golden_path, index=False)
+        print(f"golden output of {len(manifest)} pages written to {golden_path}")
+        sys.exit()
+
+    golden = pd.read_csv(golden_path) if os.path.exists(golden_path) else None
+    if golden is None:
+        print(f"{golden_path} not found, output is not checked (python benchmark.py --golden writes it)")
+
+    report = []
+    failed = False
+
+    for backend in (args or ["lxml", "selenium"]):
+        try:
+            output, totals = run_lxml(path, manifest) if backend == "lxml" else run_selenium(path, manifest)
+        except Exception as e:
+            print(f"{backend} backend skipped ({type(e).__name__}: {e})")
+            continue
+
+        mismatches = compare(output, golden) if golden is not None else {}
+        failed = failed or any(mismatches.values())
+
+        for kind, (pages, rows, seconds) in totals.items():
+            report.append([backend, kind, pages, rows, seconds, pages/seconds, rows/seconds, mismatches.get(kind)])
+
+    if not report:
+        print("no backend could be run")
+        sys.exit(1)
+
+    report = pd.DataFrame(report, columns=['backend', 'kind', 'pages', 'rows', 'seconds', 'pages/s', 'rows/s', 'mismatches'])
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    report.to_csv(OUTPUT_PATH, index=False)
+
+    if failed:
+        print("output differs from the golden csv")
+        sys.exit(1)
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import os
+import sys
+import warnings
+
+from stats_store import open_store
+
+# builds a final_pmr.csv style dataset (data/built_pmr.csv) from the player
+# stats in data/stats_pmr/
+#
+#   mBias      map bias of the match map
+#   <stat>da   difference of the team averages (team 1 - team 2) of a player stat
+#   winner     1 if team 1 won
+#
+# every feature is standardized (zero mean, unit variance) over all matches.
+# the unscaled features are kept in data/features_pmr/ and only matches that
+# aren't in there yet get computed, so a rebuild after a scrape costs the new
+# matches plus one pass of the scaling
+#
+# the build is scaled over the matches in the store only, so it is written
+# next to data/final_pmr.csv rather than over it. an existing output is never
+# replaced by a build that is missing some of its matches. the scaling goes
+# next to the dataset (data/built_pmr.scaler.json) with a hash of its match ids
+#
+# usage: python build_features.py [--full] [--output PATH]
+#   --full recomputes every match instead of only the new ones
+#   --output writes the dataset somewhere other than BUILD_PATH
+
+STORE_PATH = 'data/stats_pmr'
+RAW_PATH = 'data/features_pmr'
+BUILD_PATH = 'data/built_pmr.csv'
+
+# scaling of a dataset, saved next to it: data/built_pmr.csv -> data/built_pmr.scaler.json
+def scaler_path(dataset):
+    return os.path.splitext(dataset)[0] + '.scaler.json'
+
+
+SCALER_PATH = scaler_path(BUILD_PATH)
+
+# one per player stat, in stats_store.STATS order
+DIFF_FEATURES = ['CRda', 'HRda', 'KDda', 'HLTVrda', 'WRda', 'HSpda', 'ADRda', 'CSda', 'ESda', 'MWRda', 'MPRda']
+FEATURES = ['mBias'] + DIFF_FEATURES
+
+
+# -- FEATURES -- #
+
+# (matches, 10, 11) player stats -> (matches, 11) team average differences,
+# missing players (NaN) are left out of their team's average
+def team_differences(stats):
+    with warnings.catch_warnings():
+        # a team with nobody scraped averages to NaN, that's expected
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        t1 = np.nanmean(stats[:, :5], axis=1)
+        t2 = np.nanmean(stats[:, 5:], axis=1)
+    return t1 - t2
+
+
+# unscaled feature matrix, (matches, 12)
+def raw_features(stats, map_bias):
+    return np.column_stack([map_bias, team_differences(stats)])
+
+
+def fit_scaler(raw):
+    mean = np.nanmean(raw, axis=0)
+    std = np.nanstd(raw, axis=0)
+    std[std == 0] = 1
+    return mean, std
+
+
+def scale(raw, mean, std):
+    return (raw - mean) / std
+
+
+# fingerprint of the matches a scaler was fitted on, order doesn't matter
+def ids_hash(ids):
+    return hashlib.sha256(np.sort(np.asarray(ids, dtype='<i8')).tobytes()).hexdigest()
+
+
+def save_scaler(mean, std, ids, path=SCALER_PATH):
+    with open(path, 'w') as f:
+        json.dump({
+            'features': FEATURES,
+            'mean': mean.tolist(),
+            'std': std.tolist(),
+            'matches': len(ids),
+            'match_ids_sha256': ids_hash(ids),
+        }, f, indent=4)
+
+
+# ids, if given, have to be the matches the scaler was fitted on
+def load_scaler(path=SCALER_PATH, ids=None):
+    with open(path) as f:
+        scaler = json.load(f)
+
+    if ids is not None and scaler.get('match_ids_sha256') != ids_hash(ids):
+        raise ValueError(f"{path} was fitted on other matches ({scaler.get('matches')} rows) than the {len(ids)} given")
+
+    return np.array(scaler['mean']), np.array(scaler['std'])
+
+
+# -- UNSCALED FEATURE CACHE -- #
+
+def load_raw(path=RAW_PATH):
+    ids_path = os.path.join(path, 'match_id.i8')
+    if not os.path.exists(ids_path):
+        return np.empty(0, dtype='<i8'), np.empty((0, len(FEATURES))), np.empty(0, dtype='i1')
+
+    ids = np.fromfile(ids_path, dtype='<i8')
+    n = len(ids)
+    raw = np.fromfile(os.path.join(path, 'raw.f8'), dtype='<f8')[:n * len(FEATURES)].reshape(n, len(FEATURES))
+    winner = np.fromfile(os.path.join(path, 'winner.i1'), dtype='i1')[:n]
+    return ids, raw, winner
+
+
+def append_raw(ids, raw, winner, path=RAW_PATH):
+    os.makedirs(path, exist_ok=True)
+
+    # match ids are written last, so after a crash mid write the other files
+    # can be a few rows long. cut them back before appending
+    ids_path = os.path.join(path, 'match_id.i8')
+    n = os.path.getsize(ids_path) // 8 if os.path.exists(ids_path) else 0
+    for name, size in (('raw.f8', 8 * len(FEATURES)), ('winner.i1', 1)):
+        if os.path.exists(os.path.join(path, name)):
+            with open(os.path.join(path, name), 'r+b') as f:
+                f.truncate(n * size)
+
+    for name, values, dtype in (('raw.f8', raw, '<f8'), ('winner.i1', winner, 'i1'), ('match_id.i8', ids, '<i8')):
+        with open(os.path.join(path, name), 'ab') as f:
+            np.asarray(values, dtype=dtype).tofile(f)
+
+
+def clear_raw(path=RAW_PATH):
+    for name in ('raw.f8', 'winner.i1', 'match_id.i8'):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+
+# computes the matches in the stats store that aren't cached yet
+def update_raw(store, path=RAW_PATH, full=False):
+    if full:
+        clear_raw(path)
+
+    done = load_raw(path)[0]
+    arrays = store.load()
+
+    new = ~np.isin(arrays['match_id'], done)
+    if new.any():
+        raw = raw_features(arrays['stats'][new], arrays['map_bias'][new])
+        append_raw(arrays['match_id'][new], raw, arrays['winner'][new], path)
+
+    return int(new.sum())
+
+
+# -- RUN -- #
+
+# refuses to replace a dataset that has matches the new build doesn't
+def check_overwrite(path, ids):
+    if not os.path.exists(path):
+        return
+
+    existing = pd.read_csv(path, usecols=['match_id'])['match_id'].to_numpy()
+    missing = np.setdiff1d(existing, ids)
+    if len(missing):
+        raise ValueError(f"{path} has {len(missing)} matches that aren't in {STORE_PATH}, not overwriting it (pass --output)")
+
+
+def build(full=False, output=BUILD_PATH):
+    store = open_store(STORE_PATH)
+
+    added = update_raw(store, RAW_PATH, full)
+    ids, raw, winner = load_raw(RAW_PATH)
+    print(f"{added} new matches, {len(ids)} total")
+
+    # a team with no scraped players has no average to compare
+    complete = ~np.isnan(raw).any(axis=1)
+    if not complete.all():
+        print(f"skipping {int((~complete).sum())} matches with a team missing")
+    ids, raw, winner = ids[complete], raw[complete], winner[complete]
+
+    check_overwrite(output, ids)
+
+    mean, std = fit_scaler(raw)
+    save_scaler(mean, std, ids, scaler_path(output))
+
+    final = pd.DataFrame(scale(raw, mean, std), columns=FEATURES)
+    final.insert(0, 'match_id', ids)
+    final['winner'] = winner
+
+    final.to_csv(output)
+    print(f"saved {len(final)} rows to {output}")
+
+    return final
+
+
+if __name__ == "__main__":
+    output = sys.argv[sys.argv.index('--output') + 1] if '--output' in sys.argv else BUILD_PATH
+    build(full='--full' in sys.argv, output=output)
@@ -0,0 +1,125 @@
+import sqlite3
+import json
+import random
+
+JOURNAL_PATH = 'data/crawl_journal.db'
+
+# attempts per unit (one page load) before it is given up on
+MAX_RETRIES = 4
+
+# retry delay, doubles every attempt up to RETRY_CAP, then +-50% jitter
+RETRY_BASE = 5
+RETRY_CAP = 120
+
+
+# durable progress of deep_scraper.py. every finished page load is written
+# here straight away:
+#   matches  - scoreboard of a match (winner, map, player links)
+#   players  - profile stats and maps table of each player of a match
+# so after a crash or restart the scheduler picks up at the exact page that
+# failed, and reuses everything that was already loaded
+class CrawlJournal():
+    def __init__(self, path=JOURNAL_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS matches ('
+            'match_id INTEGER PRIMARY KEY, '
+            'winner TEXT, '
+            'map TEXT, '
+            'links TEXT, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            "state TEXT NOT NULL DEFAULT 'pending');"
+
+            'CREATE TABLE IF NOT EXISTS players ('
+            'match_id INTEGER NOT NULL, '
+            'idx INTEGER NOT NULL, '
+            'link TEXT NOT NULL, '
+            'profile TEXT, '
+            'maps TEXT, '
+            'profile_attempts INTEGER NOT NULL DEFAULT 0, '
+            'maps_attempts INTEGER NOT NULL DEFAULT 0, '
+            'PRIMARY KEY (match_id, idx));'
+        )
+        self.conn.commit()
+
+    # -- MATCHES -- #
+
+    # (winner, map, links) of a scoreboard already loaded, or None
+    def match(self, match_id):
+        row = self.conn.execute(
+            'SELECT winner, map, links FROM matches WHERE match_id = ? AND links IS NOT NULL', (match_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def failed_matches(self):
+        return {row[0] for row in self.conn.execute("SELECT match_id FROM matches WHERE state = 'failed'")}
+
+    def save_match(self, match_id, winner, match_map, links):
+        self.conn.execute(
+            'INSERT INTO matches (match_id, winner, map, links) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(match_id) DO UPDATE SET winner = excluded.winner, map = excluded.map, links = excluded.links',
+            (match_id, winner, match_map, json.dumps(links))
+        )
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO players (match_id, idx, link) VALUES (?, ?, ?)',
+            [(match_id, idx, link) for idx, link in enumerate(links)]
+        )
+        self.conn.commit()
+
+    # match row is written, player progress isn't needed anymore
+    def finish(self, match_id):
+        self.conn.execute("UPDATE matches SET state = 'done' WHERE match_id = ?", (match_id,))
+        self.conn.execute('DELETE FROM players WHERE match_id = ?', (match_id,))
+        self.conn.commit()
+
+    def give_up(self, match_id):
+        self.conn.execute("UPDATE matches SET state = 'failed' WHERE match_id = ?", (match_id,))
+        self.conn.commit()
+
+    # -- PLAYERS -- #
+
+    # {idx: [profile, maps]} of the pages already loaded for a match
+    def players(self, match_id):
+        rows = self.conn.execute('SELECT idx, profile, maps FROM players WHERE match_id = ?', (match_id,))
+        return {
+            idx: [json.loads(profile) if profile else None, json.loads(maps) if maps else None]
+            for idx, profile, maps in rows
+        }
+
+    # kind is "profile" or "maps"
+    def save_page(self, match_id, idx, kind, value):
+        self.conn.execute(f'UPDATE players SET {kind} = ? WHERE match_id = ? AND idx = ?', (json.dumps(value), match_id, idx))
+        self.conn.commit()
+
+    # -- RETRIES -- #
+
+    # counts a failed attempt at a task, returns how many there have been
+    def failed(self, task):
+        if task[0] == "match":
+            self.conn.execute(
+                'INSERT INTO matches (match_id, attempts) VALUES (?, 1) '
+                'ON CONFLICT(match_id) DO UPDATE SET attempts = attempts + 1',
+                (task[1],)
+            )
+            attempts = self.conn.execute('SELECT attempts FROM matches WHERE match_id = ?', (task[1],)).fetchone()[0]
+        else:
+            kind, match_id, idx = task[:3]
+            self.conn.execute(
+                f'UPDATE players SET {kind}_attempts = {kind}_attempts + 1 WHERE match_id = ? AND idx = ?', (match_id, idx)
+            )
+            attempts = self.conn.execute(
+                f'SELECT {kind}_attempts FROM players WHERE match_id = ? AND idx = ?', (match_id, idx)
+            ).fetchone()[0]
+
+        self.conn.commit()
+        return attempts
+
+    def close(self):
+        self.conn.close()
+
+
+# seconds to wait before the next attempt
+def backoff(attempts):
+    return min(RETRY_CAP, RETRY_BASE * 2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
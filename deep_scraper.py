@@ -1,7 +1,3 @@
-from selenium import webdriver
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, NoSuchWindowException, WebDriverException
 
 import pandas as pd
@@ -9,35 +5,43 @@ import seaborn as sb
 import os.path
 import time
 import datetime as dt
-from collections import deque\
+import threading
+import queue
+import heapq
+from collections import deque
+
+from player_cache import PlayerCache, map_stats, map_bias
+import parse_selenium
+import parse_lxml
+from stats_store import open_store
+from crawl_journal import CrawlJournal, MAX_RETRIES, backoff
+from seen_index import SeenIndex
+from match_loader import match_ids
+from player_store import PlayerStore
+from driver_factory import make_driver, accept_cookies, wait_for
+from metrics import Metrics
 
 LINK = "https://csstats.gg/match"
-PATH = "C:\Program Files (x86)\Devtools\chromedriver-win64\chromedriver.exe" # depends on your system
 
+# number of browser sessions scraping at the same time (1 = old sequential behaviour)
+WORKERS = 4
 
-# -- DRIVER SETUP -- #
-options = webdriver.ChromeOptions()
-
-# prevents driver from automaticallty closing the window
-options.add_experimental_option(name="detach", value=True)
-# prevents weird ass info
-options.add_argument('--ignore-certificate-errors')
-options.add_argument('--ignore-ssl-errors')
-
-cService = webdriver.ChromeService(executable_path=PATH)
-driver = webdriver.Chrome(options=options, service=cService)
-
-# ensures viewport is same on all devices (namely PCs and laptops)
-driver.maximize_window()
+# matches handed to scrape_all at a time by a StatsQueue
+QUEUE_BATCH = 10
 
-# adds an implicit delay to wait for loading, pop-ups, etc
-driver.implicitly_wait(10)
+# "lxml" parses the page html in one pass, "selenium" reads every element through the driver
+BACKEND = "lxml"
 
+# driver_factory profile, "lean" is headless and skips images, fonts and trackers,
+# "full" opens a normal window (only sensible with WORKERS = 1)
+PROFILE = "lean"
 
-# -- DATAFRAME SETUP -- #
-df_matches_pmr = pd.read_csv('data/matches_pmr.csv')
+# page timings, errors, cache hits and rows written, rewritten after every match
+# (set METRICS_PORT to also serve them on http://127.0.0.1:<port>/metrics)
+METRICS_PATH = 'output/deep_scraper_metrics.prom'
+METRICS_PORT = None
 
-pmr_match_ids = df_matches_pmr["match_id"].to_list()
+metrics = Metrics(METRICS_PATH)
 
 # player feature reference
 features = [
@@ -55,251 +59,450 @@ features = [
     "MPR",
     ]
 
-# dataframe for features
-if os.path.exists('data/stats_pmr.csv'):
-    df_stats_pmr = pd.read_csv('data/stats_pmr.csv', index_col=0)
-else:
-    df_stats_pmr = pd.DataFrame(
-        columns=[
-            "match_id",
-            "map_bias",
-            "t1_p1",
-            "t1_p2",
-            "t1_p3",
-            "t1_p4",
-            "t1_p5",
-            "t2_p1",
-            "t2_p2",
-            "t2_p3",
-            "t2_p4",
-            "t2_p5",
-            "winner"
-
-        ]
-    )
-
-map_bias = {
-    "de_dust2"   :  0.492,
-    "de_mirage"  :  0.491,
-    "de_inferno" :  0.503,
-    "de_nuke"    :  0.470,
-    "de_vertigo" :  0.478,
-    "de_overpass":  0.482,
-    "de_office"  :  0.542,
-    "de_anubis"  :  0.514,
-    "de_ancient" :  0.497,
-    "de_italy"   :  0.578
-}
 
-while True:
-    try:
-        # -- RUN -- #
-        driver.get(LINK)
-        running = True
+# -- DRIVER SETUP -- #
 
-        # handling pop-up with shadow DOM
-        try:
-            shadow_parent = driver.find_element(by=By.CSS_SELECTOR, value='#usercentrics-root')
-            outer = driver.execute_script('return arguments[0].shadowRoot', shadow_parent)
-            cookie_button = outer.find_element(By.CSS_SELECTOR, "button[data-testid='uc-accept-all-button']")
-            cookie_button.click()
-        except Exception:
-            pass
-
-        # checks if match_id has been scraped
-        scraped_ids = df_stats_pmr['match_id'].to_list()
-
-        # scrapes individual matches
-        for id in pmr_match_ids:
-            
-            # skips if already scraped
-            if id in scraped_ids:
-                continue
+def create_driver():
+    driver = make_driver(PROFILE)
+
+    driver.get(LINK)
+    accept_cookies(driver)
+
+    return driver
+
+
+# -- SCRAPING -- #
+
+# reads the page html and parses it with lxml in one pass
+# instead of asking the browser for every value
+def scrape_match(driver, id):
+    web_path = LINK + "/" + str(id)
+    with metrics.timer("match", "load"):
+        driver.get(web_path)
+        wait_for(driver, parse_selenium.MATCH_WAIT)
+
+    with metrics.timer("match", "parse"):
+        if BACKEND == "lxml":
+            winner, match_map, player_links = parse_lxml.parse_match(driver.page_source)
+        else:
+            winner, match_map, player_links = parse_selenium.parse_match(driver)
+    metrics.parsed("match", 2 + len(player_links))
+
+    print(f"WINNER = {winner}")
+
+    return winner, match_map, player_links
+
+
+def scrape_profile_page(driver, link):
+    with metrics.timer("profile", "load"):
+        driver.get(link)
+        wait_for(driver, parse_selenium.PROFILE_WAIT)
+
+    with metrics.timer("profile", "parse"):
+        if BACKEND == "lxml":
+            stats = parse_lxml.parse_profile(driver.page_source)
+        else:
+            stats = parse_selenium.parse_profile(driver)
+    metrics.parsed("profile", len(stats))
+
+    current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es = stats
+    print(f"\nCS | ES : {cs} | {es}")
+    print(f"WR | HS : {wr} | {hs}")
+    print(f"kd | hltvr : {kd} | {hltvr}")
+
+    '''
+    current_rank, best_rank, kd, hltvr, wr, hs, adr, cs, es
+    '''
+    return stats
+
+
+def scrape_maps_page(driver, link):
+    # Maps stats
+    with metrics.timer("maps", "load"):
+        driver.get(link+"#/maps")
+        wait_for(driver, parse_selenium.MAPS_WAIT)
+
+    with metrics.timer("maps", "parse"):
+        if BACKEND == "lxml":
+            map_table = parse_lxml.parse_maps(driver.page_source)
+        else:
+            map_table = parse_selenium.parse_maps(driver)
+    metrics.parsed("maps", 2*len(map_table))
+
+    return map_table
+
+
+def scrape_profile(driver, link):
+    return scrape_profile_page(driver, link), scrape_maps_page(driver, link)
 
-            web_path = LINK + "/" + str(id)
-            driver.get(web_path)
 
-            # checks if t1 win or lose
-            scores = driver.find_elements(By.XPATH, '//span[@class="team-score-number"]')
-            winner = "team_1" if int(scores[0].text) >= int(scores[1].text) else "team_2"
-            print(f"WINNER = {winner}")
+# adds the map dependent stats to a (cached or fresh) profile
+def player_stats(profile, match_map):
+    stats, map_table = profile
 
-            # get map
-            match_map = driver.find_element(By.XPATH, '//div[@class="flex flex-wrap "]/div[3]/img').get_attribute('title')
+    mwr, mpr = map_stats(map_table, match_map)
+    print(f"MWR | MPR : {mwr} | {mpr}")
 
-            # get map bias
-            bias = map_bias.get(match_map)
+    '''
+    current_rank, best_rank, kd, hltvr, wr, hs, adr, cs, es, mwr, mpr
+    '''
+    return stats + [mwr, mpr]
 
-            # getting link to each player stats
-            player_links = []
 
-            table = driver.find_element(By.TAG_NAME, "table")
-            tbodies = table.find_elements(By.TAG_NAME, "tbody") # tbody[0] = t1, tbody[2] = t2
+# -- WORKER POOL -- #
 
-            #t1
-            rows = tbodies[0].find_elements(By.TAG_NAME, "tr")
-            for row in rows[1:]:
+# each worker owns one browser and takes tasks off the shared queue:
+#   ("match", id)                     -> ("match", id, winner, map, player_links)
+#   ("player", id, index, link)       -> the profile and maps results below, the maps
+#                                        tab is then only a fragment change on the
+#                                        page the same driver just loaded
+#   ("profile", id, index, link)      -> ("profile", id, index, link, stats)
+#   ("maps", id, index, link)         -> ("maps", id, index, link, map_table)
+# every page is sent back as soon as it is loaded. a failed page is sent back as
+# ("error", (page, id, ...), exception) so the scheduler can retry it
+def worker(tasks, results):
+    driver = None
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        # a player task is reported page by page, also when the driver fails
+        # before the first one, the journal only counts attempts per page
+        pages = [("profile",) + task[1:], ("maps",) + task[1:]] if task[0] == "player" else [task]
+        page = pages[0]
+        try:
+            if driver is None:
+                driver = create_driver()
+
+            if task[0] == "match":
+                winner, match_map, player_links = scrape_match(driver, task[1])
+                results.put(("match", task[1], winner, match_map, player_links))
+            else:
+                for page in pages:
+                    if page[0] == "profile":
+                        results.put(page + (scrape_profile_page(driver, page[3]),))
+                    else:
+                        results.put(page + (scrape_maps_page(driver, page[3]),))
+
+        except Exception as e:
+            metrics.error(page[0], e)
+            print(f"{page[0]} page failed ({type(e).__name__}), restarting driver. . .")
+            if driver is not None:
                 try:
-                    player_links.append(row.find_element(By.TAG_NAME, "a").get_attribute("href"))
-                except NoSuchElementException:
-                    print("Player is missing")
+                    driver.quit()
+                except Exception:
+                    pass
+            driver = None
+            results.put(("error", page, e))
+
+    if driver is not None:
+        driver.quit()
+
+
+# hands out tasks to the workers and is the only one touching the cache,
+# the journal, the player store and the output. every finished page is
+# journaled, so a restart resumes at the page that failed
+def scrape_all(match_ids, on_row, cache, journal, players, workers=WORKERS):
+    tasks = queue.Queue()
+    results = queue.Queue()
+
+    threads = [threading.Thread(target=worker, args=(tasks, results), daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    # the workers are always stopped, also when the scheduler raises, so a
+    # restart never leaves the browsers of the last attempt running
+    try:
+        failed = journal.failed_matches()
+        pending = deque(id for id in match_ids if id not in failed)
+        in_flight = {} # match_id -> [winner, map, players_stats, players left]
+        partial = {}   # (match_id, index) -> [profile stats, map table]
+        retries = []   # heap of (time, task) waiting to be handed out again
+
+        def player_done(id, index, profile):
+            state = in_flight[id]
+            state[2][index] = None if profile is None else player_stats(profile, state[1])
+            state[3] -= 1
+            finish(id)
+
+        def finish(id):
+            winner, match_map, players_stats, left = in_flight[id]
+            if left == 0:
+                del in_flight[id]
+                on_row(id, winner, match_map, players_stats)
+                journal.finish(id)
+                feed()
+
+        # cached or journaled players are filled in straight away, only the
+        # missing pages are handed out to whichever workers are free
+        def start_players(id, winner, match_map, player_links):
+            in_flight[id] = [winner, match_map, [None]*10, len(player_links)]
+            saved = journal.players(id)
+
+            for index, link in enumerate(player_links):
+                profile = cache.get(link)
+                if profile is not None:
+                    players.record(id, index, link)
+                    player_done(id, index, profile)
                     continue
 
-            #t2
-            rows = tbodies[2].find_elements(By.TAG_NAME, 'tr')
-            for row in rows[1:]:
-                try:
-                    player_links.append(row.find_element(By.TAG_NAME, "a").get_attribute("href"))
-                except NoSuchElementException:
-                    print("Player is missing")
+                pages = saved.get(index, [None, None])
+                if pages[0] is not None and pages[1] is not None:
+                    cache.put(link, *pages)
+                    players.record(id, index, link, pages)
+                    player_done(id, index, pages)
                     continue
 
-            players_stats = [None]*10
-            p_index = 0
-            
-            # goes to each player stats
-            for link in player_links:
-                driver.get(link)
-
-                player_ranks = driver.find_elements(By.XPATH, '//div[@class="ranks"]')
-
-                # player ratings
-                for p in player_ranks:
-                    if p.find_element(By.TAG_NAME, "img").get_attribute("title") == "Premier":
-                        over = p.find_element(By.TAG_NAME, 'div')
-                        overs = over.find_elements(By.TAG_NAME,'div')
-
-                        # current rating
-                        try:
-                            current_rating = int(overs[1].text.replace(',',''))
-                        except Exception:
-                            current_rating = 0
-                        
-                        # best rating
-                        try:
-                            best_rating = int(overs[-1].text.replace(',',''))
-                        except Exception:
-                            best_rating = current_rating
-
-                        #print(f"current rating: {current_rating},  best rating: {best_rating}\n")
-                        break
-
-                # KD
-                try:
-                    kd = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[1]/div/div[2]/div[2]/div/span').text)
-                except ValueError:
-                    kd = float(0)
+                partial[(id, index)] = pages
+                tasks.put(player_task(id, index, link))
+
+            # nobody on the scoreboard
+            if not player_links:
+                finish(id)
+
+        # one task for the pages of a player still missing, both on one driver
+        def player_task(id, index, link):
+            pages = partial[(id, index)]
+            if pages[0] is None and pages[1] is None:
+                return ("player", id, index, link)
+            return ("profile" if pages[0] is None else "maps", id, index, link)
+
+        # keeps at most one match per worker in flight so player tasks don't pile up
+        def feed():
+            while pending and len(in_flight) < workers:
+                id = pending.popleft()
+
+                scoreboard = journal.match(id)
+                if scoreboard is None:
+                    in_flight[id] = None
+                    tasks.put(("match", id))
+                else:
+                    start_players(id, *scoreboard)
+
+        def retry(task, error):
+            attempts = journal.failed(task)
+            if attempts < MAX_RETRIES:
+                metrics.retry(task[0])
+                heapq.heappush(retries, (time.time() + backoff(attempts), task))
+                return
+
+            metrics.inc('scraper_gave_up_total', page=task[0])
+            print(f"giving up on {task[0]} page of match {task[1]} after {attempts} attempts ({error})")
+            if task[0] == "match":
+                journal.give_up(task[1])
+                del in_flight[task[1]]
+                feed()
+            elif partial.pop(task[1:3], None) is not None:
+                # player left out of the match, like a player missing from the scoreboard
+                player_done(task[1], task[2], None)
+
+        feed()
+
+        while in_flight:
+            # hands back the tasks whose retry delay is over, a player's failed
+            # profile goes out together with its maps tab again
+            while retries and retries[0][0] <= time.time():
+                task = heapq.heappop(retries)[1]
+                if task[0] == "match":
+                    tasks.put(task)
+                elif task[1:3] in partial:
+                    tasks.put(player_task(*task[1:]))
+
+            try:
+                result = results.get(timeout=max(0, retries[0][0] - time.time()) if retries else None)
+            except queue.Empty:
+                continue
 
-                # HLTV rating
-                try:
-                    hltvr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[2]/div/div[2]/div[2]/div/span').text)
-                except ValueError:
-                    hltvr = float(0)
+            if result[0] == "error":
+                retry(result[1], result[2])
 
-                # WR (win rate)
-                try:
-                    wr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[3]/div/div[2]/div[2]').text.replace('\n','').replace(' ','').split('%')[0])/100
-                except ValueError:
-                    wr = float(0)
+            elif result[0] == "match":
+                _, id, winner, match_map, player_links = result
+                journal.save_match(id, winner, match_map, player_links)
+                start_players(id, winner, match_map, player_links)
 
-                # HSp (head shots percentage)
-                try:
-                    hs = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[4]/div/div[2]/div[2]').text.replace('\n','').replace(' ','').split('%')[0])/100
-                except ValueError:
-                    hs = float(0)
+            else:
+                kind, id, index, link, value = result
+                pages = partial.get((id, index))
+                if pages is None: # player already given up on
+                    continue
 
-                # ADR
-                try:
-                    adr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[5]/div/div[2]/div[2]').text[:-1])/100
-                except ValueError:
-                    adr = float(0)
-                    
-                # CSp (clutch success)
-                try:
-                    cs = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[2]/div/div[1]/div[2]/div/span[2]').text[:-1])/100
-                except ValueError:
-                    cs = float(0)
-                    
-                # ESp (entry success)
-                try:
-                    es = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[2]/div/div[2]/div[2]/div/span[2]').text[:-1])/100
-                except ValueError:
-                    es = float(0)
-                    
-                print(f"\nCS | ES : {cs} | {es}")
-                print(f"WR | HS : {wr} | {hs}")
-                print(f"kd | hltvr : {kd} | {hltvr}")
+                journal.save_page(id, index, kind, value)
+                pages[0 if kind == "profile" else 1] = value
+
+                if pages[0] is not None and pages[1] is not None:
+                    del partial[(id, index)]
+                    cache.put(link, *pages)
+                    players.record(id, index, link, pages)
+                    player_done(id, index, pages)
+
+    finally:
+        # pages not handed out yet are dropped, the journal has them
+        while True:
+            try:
+                tasks.get_nowait()
+            except queue.Empty:
+                break
 
-                # Maps stats
-                driver.get(link+"#/maps")
+        for _ in threads:
+            tasks.put(None)
+        for t in threads:
+            t.join()
 
-                maps = driver.find_elements(By.XPATH, '//div[@class="content-tab current-tab"]/div/div')[1:]
 
-                play_count = 0
-                highest_play_count = 0
-            
-                for map in maps:
-                    map_title = map.find_element(By.TAG_NAME, 'span').text
-                    map_stat = map.find_element(By.TAG_NAME, 'div')
-                    
-                    # MWR (map win rate)
-                    if map_title == match_map:
-                        mwr = int(map_stat.find_elements(By.TAG_NAME, 'div')[2].text[:-1])/100
-                        highest_play_count = int(map_stat.find_element(By.XPATH, './div[@style="float:left; padding-top:22px; width:20%"]').text)
-                        
-                    # MPR (map play rate)
-                    play_count += int(map_stat.find_element(By.XPATH, './div[@style="float:left; padding-top:22px; width:20%"]').text)
-            
-                mpr = play_count and highest_play_count / play_count or 0
-                print(f"MWR | MPR : {mwr} | {mpr}")
+# -- QUEUES -- #
 
-                '''
-                current_rank, best_rank, kd, hltvr, wr, hs, adr, cs, es, mwr, mpr
-                '''
-                player_stats = [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es, mwr, mpr] 
-                players_stats[p_index] = player_stats
-                p_index += 1      
-                
-            # appends to dataframe
-            new_row = {
-                "match_id":id,
-                "map_bias":bias,
-                "t1_p1":players_stats[0],
-                "t1_p2":players_stats[1],
-                "t1_p3":players_stats[2],
-                "t1_p4":players_stats[3],
-                "t1_p5":players_stats[4],
-                "t2_p1":players_stats[5],
-                "t2_p2":players_stats[6],
-                "t2_p3":players_stats[7],
-                "t2_p4":players_stats[8],
-                "t2_p5":players_stats[9],
-                "winner": winner
-            }
+# match listing, seen index, stats store and old csv of each match type
+QUEUES = {
+    'pmr': ('data/matches_pmr_2.csv', 'data/seen_stats_pmr.bin', 'data/stats_pmr', 'data/stats_pmr.csv'),
+    'ofc': ('data/matches_ofc_2.csv', 'data/seen_stats_ofc.bin', 'data/stats_ofc', 'data/stats_ofc.csv'),
+}
+
+
+# deep stats of one match type, fed with match ids while scraper.py reads the
+# listing. every queue has its own thread, browsers, seen index and append-only
+# stats store, so a burst of matches of one type never holds up the other.
+# matches listed on earlier runs but never deep scraped are queued on start
+class StatsQueue():
+    def __init__(self, name, workers=WORKERS, batch=QUEUE_BATCH):
+        matches_csv, seen_path, store_path, csv_path = QUEUES[name]
+
+        self.name = name
+        self.workers = workers
+        self.batch = batch
+
+        self.seen = SeenIndex(seen_path, seed_csvs=[csv_path])
+        self.store = open_store(store_path, csv_path, seen=self.seen)
+
+        self.pending = queue.Queue()
+        self.stopping = threading.Event()
+        if os.path.exists(matches_csv):
+            for id in match_ids(matches_csv).tolist():
+                if id not in self.seen:
+                    self.pending.put(id)
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def put(self, id):
+        self.pending.put(int(id))
+
+    # finishes the batch in progress and leaves the queued matches, they are
+    # queued again on the next start (and the journal keeps their pages)
+    def stop(self):
+        self.stopping.set()
+        self.pending.put(None) # wakes the thread if it is waiting for ids
+        self.thread.join()
+
+    # up to batch ids, waits for the first one. empty once stopping
+    def next_batch(self):
+        ids = [self.pending.get()]
+        while not self.stopping.is_set() and len(ids) < self.batch:
+            try:
+                ids.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+
+        if self.stopping.is_set():
+            return []
+        return [id for id in ids if id is not None]
+
+    # single writer of this queue's store, called from its own scheduler
+    def write_row(self, id, winner, match_map, players_stats):
+        with metrics.timer("match", "write"):
+            self.store.append(id, map_bias.get(match_map), players_stats, winner)
+        self.seen.add(id)
+
+        metrics.rows(f"stats_{self.name}")
+        metrics.set('scraper_queue_pending', self.pending.qsize(), queue=self.name)
+        metrics.cache(self.cache, queue=self.name)
+        metrics.write()
+
+    def run(self):
+        # sqlite connections stay in the thread that opened them
+        self.cache = PlayerCache()
+        self.cache.prune()
+        journal = CrawlJournal()
+        players = PlayerStore()
+
+        while not self.stopping.is_set():
+            ids = [id for id in self.next_batch() if id not in self.seen]
+            while ids and not self.stopping.is_set():
+                try:
+                    scrape_all(ids, self.write_row, self.cache, journal, players, workers=self.workers)
+                    break
 
-            df_stats_pmr = df_stats_pmr._append(new_row, ignore_index=True)
-            df_stats_pmr.reset_index(inplace = True, drop = True)
-            df_stats_pmr.to_csv('data/stats_pmr.csv')
+                except Exception as e:
+                    metrics.error("scheduler", e)
+                    print(f"{self.name} queue stopped unexpectedly ({type(e).__name__}), resuming from the journal. . .")
+                    time.sleep(backoff(1))
+                    ids = [id for id in ids if id not in self.seen]
 
-    except Exception:
-        print("Driver closed unexpectedly, restarting. . .")
-        time.sleep(5) 
+        print(f"{self.name} player cache hits | misses : {self.cache.hits} | {self.cache.misses}")
+        self.cache.close()
+        journal.close()
+        players.close()
 
 
-        
-        
+# -- RUN -- #
 
+if __name__ == "__main__":
 
+    # -- DATAFRAME SETUP -- #
+    pmr_match_ids = match_ids('data/matches_pmr.csv').tolist()
 
+    # match ids that already have a stats row
+    seen_stats = SeenIndex('data/seen_stats_pmr.bin', seed_csvs=['data/stats_pmr.csv'])
 
+    # output for features, one row per match appended to the columnar store
+    # (data/stats_pmr/, filled from the old stats_pmr.csv on first run)
+    store = open_store('data/stats_pmr', 'data/stats_pmr.csv', seen=seen_stats)
 
+    # scraped player profiles, shared by every match they appear in
+    cache = PlayerCache()
+    cache.prune()
 
+    # progress of every page load, lets a restart pick up where it failed
+    journal = CrawlJournal()
 
+    # every scraped profile over time, by profile id
+    players = PlayerStore()
 
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
 
+    # single writer, only the main thread touches the output
+    def write_row(id, winner, match_map, players_stats):
+        with metrics.timer("match", "write"):
+            store.append(id, map_bias.get(match_map), players_stats, winner)
+        seen_stats.add(id)
+
+        metrics.rows("stats_pmr")
+        metrics.cache(cache)
+        metrics.write()
+
+    while True:
+        try:
+            to_scrape = [id for id in pmr_match_ids if id not in seen_stats]
 
-                
+            scrape_all(to_scrape, write_row, cache, journal, players)
+            break
 
-            
+        except Exception as e:
+            metrics.error("scheduler", e)
+            print(f"Scraper stopped unexpectedly ({type(e).__name__}), resuming from the journal. . .")
+            time.sleep(backoff(1))
 
+    print(f"player cache hits | misses : {cache.hits} | {cache.misses}")
+    metrics.cache(cache)
+    metrics.write()
+    cache.close()
+    journal.close()
+    players.close()
 
+    print("Session Completed")
@@ -0,0 +1,105 @@
+from selenium import webdriver
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+
+# one place to start chrome for scraper.py, deep_scraper.py, pipeline.py and test1.py
+#
+#   "full" - the old setup, a maximized window that stays open, loads everything
+#   "lean" - headless, no images / fonts / media / ads / trackers, and pages count
+#            as loaded once the html is parsed (eager) instead of after every
+#            last resource. parsing waits explicitly for the elements it reads
+#
+# images are only blocked from downloading, the <img> tags and their titles
+# (maps, player names, ranks) are still in the page
+
+PATH = "C:\Program Files (x86)\Devtools\chromedriver-win64\chromedriver.exe" # depends on your system
+
+SITE = "https://csstats.gg"
+
+# url patterns the lean profile never downloads
+BLOCKED_URLS = [
+    # images, fonts, media
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    # third party ads, analytics and consent
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*adservice.google.*", "*amazon-adsystem.com*",
+    "*nitropay.com*", "*fundingchoicesmessages.google.com*",
+    "*usercentrics.eu*", "*facebook.net*", "*hotjar.com*",
+]
+
+# longest an explicit wait lasts
+WAIT_TIMEOUT = 10
+
+
+def make_driver(profile="lean", headless=None, implicit_wait=0, path=PATH):
+    lean = profile == "lean"
+    if headless is None:
+        headless = lean
+
+    options = webdriver.ChromeOptions()
+    # prevents weird ass info
+    options.add_argument('--ignore-certificate-errors')
+    options.add_argument('--ignore-ssl-errors')
+
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    else:
+        # prevents driver from automaticallty closing the window
+        options.add_experimental_option(name="detach", value=True)
+
+    if lean:
+        options.page_load_strategy = 'eager'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--mute-audio')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.media_stream': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+
+    cService = webdriver.ChromeService(executable_path=path)
+    driver = webdriver.Chrome(options=options, service=cService)
+
+    if lean:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+
+    # ensures viewport is same on all devices (namely PCs and laptops)
+    if not headless:
+        driver.maximize_window()
+
+    driver.implicitly_wait(implicit_wait)
+
+    return driver
+
+
+# waits until every xpath in xpaths (one string or a tuple) is in the page
+def wait_for(driver, xpaths, timeout=WAIT_TIMEOUT):
+    if isinstance(xpaths, str):
+        xpaths = (xpaths,)
+
+    wait = WebDriverWait(driver, timeout)
+    for xpath in xpaths:
+        wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+
+
+# handling pop-up with shadow DOM, it never shows up when the lean profile
+# blocks the consent script
+def accept_cookies(driver, timeout=5):
+    try:
+        shadow_parent = WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, '#usercentrics-root'))
+        )
+        outer = driver.execute_script('return arguments[0].shadowRoot', shadow_parent)
+        cookie_button = WebDriverWait(outer, timeout).until(
+            lambda root: root.find_element(By.CSS_SELECTOR, "button[data-testid='uc-accept-all-button']")
+        )
+        cookie_button.click()
+    except Exception:
+        pass
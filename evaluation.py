@@ -0,0 +1,137 @@
+from sklearn.svm import SVC
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, precision_score, log_loss, roc_auc_score, recall_score, f1_score
+from sklearn.inspection import permutation_importance
+from joblib import Parallel, delayed
+
+import pandas as pd
+from time import process_time, perf_counter
+from contextlib import contextmanager
+
+# evaluation engine for model_testing.py, fits and scores every model at the
+# same time in a process pool and times each stage
+
+# cores to use, -1 = all of them
+N_JOBS = -1
+
+# feature columns (positions in final_pmr.csv) and the label column
+PRUNED = [3,4,5,6,11,12]
+LABEL = 14
+
+
+def load_dataset(path="data/final_pmr.csv", pruned=PRUNED):
+    df = pd.read_csv(path)
+    return df.iloc[:,pruned], df.iloc[:,LABEL]
+
+
+# -- TIMING -- #
+
+# wall and cpu time of a stage, the cpu time only counts this process
+@contextmanager
+def timed(name, times):
+    wall = perf_counter()
+    cpu = process_time()
+    yield
+    times.append([name, perf_counter() - wall, process_time() - cpu])
+
+
+def print_times(times):
+    print(f"{'stage':<40}{'wall (s)':>12}{'cpu (s)':>12}")
+    for name, wall, cpu in times:
+        print(f"{name:<40}{wall:>12.3f}{cpu:>12.3f}")
+
+
+# -- MODELS -- #
+
+# knn_index = "brute", "balltree" or "ivf" swaps in knn_index.IndexedKNN for
+# the sklearn KNN, same neighbours and votes on a prebuilt index
+def make_models(n_jobs=N_JOBS, knn_index=None):
+    if knn_index is None:
+        knn = KNeighborsClassifier(p=3, n_neighbors=5)
+    else:
+        from knn_index import IndexedKNN
+        knn = IndexedKNN(index=knn_index, p=3, n_neighbors=5)
+
+    return (
+        SVC(kernel='linear', C=1, gamma='scale', random_state=42, probability=True),
+        LogisticRegression(solver='liblinear', random_state=42),
+        RandomForestClassifier(n_estimators= 100, min_samples_split=2, min_samples_leaf=1, random_state=42, n_jobs=n_jobs),
+        knn
+    )
+
+
+# simple model class
+
+class Clf():
+    def __init__(self, name, y_pred, y_proba, acc, bal_acc, prc, lgl, rcl, f1, auc):
+        self.name = name
+        self.y_pred = y_pred
+        self.y_proba = y_proba
+        self.acc_score = acc
+        self.acc_bal_score = bal_acc
+        self.prc_score = prc
+        self.lgl_score = lgl
+        self.recl_score = rcl
+        self.f_score = f1
+        self.auc_roc = auc
+
+    def scores(self):
+        return [self.acc_score, self.prc_score, self.recl_score, self.f_score, self.auc_roc]
+
+
+def score(name, y_test, y_pred, y_proba):
+    return Clf(
+        name,
+        y_pred,
+        y_proba,
+        accuracy_score(y_test, y_pred),
+        balanced_accuracy_score(y_test, y_pred),
+        precision_score(y_test, y_pred),
+        log_loss(y_test, y_pred),
+        recall_score(y_test, y_pred),
+        f1_score(y_test, y_pred),
+        roc_auc_score(y_test, y_pred),
+    )
+
+
+# runs in a worker process, so it times itself
+def fit_and_score(clf, X_train, y_train, X_test, y_test):
+    times = []
+    name = type(clf).__name__
+
+    with timed(f"fit {name}", times):
+        clf.fit(X_train, y_train)
+
+    with timed(f"score {name}", times):
+        y_pred = clf.predict(X_test)
+        y_proba = clf.predict_proba(X_test)[:,1]
+        result = score(name, y_test, y_pred, y_proba)
+
+    return clf, result, times
+
+
+# fits and scores all models in parallel, returns the fitted models, a Clf per
+# model and the per model stage times
+def evaluate(clfs, X_train, y_train, X_test, y_test, n_jobs=N_JOBS):
+    jobs = Parallel(n_jobs=min(len(clfs), n_jobs) if n_jobs > 0 else n_jobs)(
+        delayed(fit_and_score)(clf, X_train, y_train, X_test, y_test) for clf in clfs
+    )
+
+    fitted = [clf for clf, _, _ in jobs]
+    results = [result for _, result, _ in jobs]
+    times = [t for _, _, model_times in jobs for t in model_times]
+
+    return fitted, results, times
+
+
+# mean permutation importance of every feature, per model
+def importances(clfs, X_test, y_test, feature_names, n_repeats=30, n_jobs=N_JOBS):
+    importances = {}
+    for clf in clfs:
+        result = permutation_importance(clf, X_test, y_test, n_repeats=n_repeats, random_state=0, n_jobs=n_jobs)
+        importances[type(clf).__name__] = result.importances_mean
+
+    return pd.DataFrame(importances, index=feature_names).transpose()
@@ -0,0 +1,226 @@
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from joblib import Parallel, delayed
+
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import os
+import sys
+from time import perf_counter
+
+from evaluation import make_models, timed, print_times, LABEL
+
+# picks the feature columns for model_testing.py instead of the hand made
+# PRUNED list
+#
+#   forward  starts empty and adds, each step, the feature that scores best with
+#            the ones already picked (every candidate of a step fitted at once)
+#   rfe      starts with everything and drops, each step, the feature with the
+#            lowest permutation importance
+#
+# a subset is scored by cross-validated accuracy and every score is cached (in
+# memory and in CACHE_PATH), so a subset both searches reach, or a rerun,
+# is never fitted twice. cached scores are keyed on the model's parameters and
+# a hash of the data, a rebuilt dataset or changed model scores afresh
+#
+# usage: python feature_selection.py [forward|rfe|both] [model]
+#   model is a class name from evaluation.make_models, LogisticRegression by default
+
+DATA_PATH = 'data/final_pmr.csv'
+OUTPUT_PATH = 'output/feature-selection-output.csv'
+CACHE_PATH = 'output/feature-subset-cache.json'
+
+# final_pmr.csv columns searched over (index, match_id, ..., winner)
+FIRST_FEATURE = 2
+
+FOLDS = 5
+N_REPEATS = 30
+N_JOBS = -1
+SEED = 42
+
+
+def load_features(path=DATA_PATH):
+    df = pd.read_csv(path)
+    features = df.iloc[:, FIRST_FEATURE:LABEL]
+    return np.ascontiguousarray(features.to_numpy(dtype=np.float64)), df.iloc[:, LABEL].to_numpy(), list(features.columns)
+
+
+def model_by_name(name):
+    for model in make_models(n_jobs=1):
+        if type(model).__name__ == name:
+            return model
+    raise ValueError(f"no model called {name} in evaluation.make_models")
+
+
+# -- SUBSET SCORES -- #
+
+# n_jobs doesn't change a score
+def model_hash(model):
+    params = sorted((name, repr(value)) for name, value in model.get_params().items() if name != 'n_jobs')
+    return hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+
+
+def data_hash(X, y):
+    digest = hashlib.sha256(np.ascontiguousarray(X).tobytes())
+    digest.update(np.asarray(y).astype('<i8').tobytes())
+    return digest.hexdigest()[:16]
+
+
+def cv_score(model, X, y, columns, folds):
+    scores = []
+    for train, test in folds:
+        clf = clone(model).fit(X[np.ix_(train, columns)], y[train])
+        scores.append(accuracy_score(y[test], clf.predict(X[np.ix_(test, columns)])))
+    return float(np.mean(scores)), float(np.std(scores))
+
+
+class SubsetScores():
+    def __init__(self, model, X, y, names, path=CACHE_PATH, n_jobs=N_JOBS):
+        self.model = model
+        self.X = X
+        self.y = y
+        self.names = names
+        self.path = path
+        self.n_jobs = n_jobs
+        self.folds = list(StratifiedKFold(n_splits=FOLDS, shuffle=True, random_state=SEED).split(X, y))
+        self.fitted = 0
+
+        # cached scores are only valid for the same model and data
+        self.prefix = f"{type(model).__name__}|{model_hash(model)}|{data_hash(X, y)}|"
+        self.cache = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.cache = json.load(f)
+
+    def key(self, columns):
+        return self.prefix + ','.join(sorted(self.names[c] for c in columns))
+
+    # (mean, std) accuracy of every subset, only the uncached ones are fitted
+    def score(self, subsets):
+        missing = [s for s in subsets if self.key(s) not in self.cache]
+
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(cv_score)(self.model, self.X, self.y, list(s), self.folds) for s in missing
+        )
+        for subset, result in zip(missing, results):
+            self.cache[self.key(subset)] = result
+        self.fitted += len(missing)
+
+        return [self.cache[self.key(s)] for s in subsets]
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.cache, f)
+
+
+# -- PERMUTATION IMPORTANCE -- #
+
+# accuracy drop of shuffling one column, n_repeats times. the column is
+# shuffled in place in the worker's own copy of X and put back afterwards,
+# the permutations of every repeat are drawn in one batch
+def column_importance(clf, X, y, column, n_repeats, seed):
+    X = X.copy()
+    original = X[:, column].copy()
+    baseline = accuracy_score(y, clf.predict(X))
+
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permuted(np.tile(original, (n_repeats, 1)), axis=1)
+
+    drops = np.empty(n_repeats)
+    for r in range(n_repeats):
+        X[:, column] = shuffled[r]
+        drops[r] = baseline - accuracy_score(y, clf.predict(X))
+    X[:, column] = original
+
+    return drops.mean()
+
+
+def permutation_importances(clf, X, y, n_repeats=N_REPEATS, n_jobs=N_JOBS, seed=SEED):
+    seeds = np.random.SeedSequence(seed).spawn(X.shape[1])
+    return np.array(Parallel(n_jobs=n_jobs)(
+        delayed(column_importance)(clf, X, y, column, n_repeats, s) for column, s in enumerate(seeds)
+    ))
+
+
+# -- SEARCHES -- #
+
+def forward(scores, n_features):
+    picked, rows = [], []
+
+    while len(picked) < n_features:
+        start = perf_counter()
+        candidates = [picked + [c] for c in range(n_features) if c not in picked]
+        results = scores.score(candidates)
+
+        best = max(range(len(candidates)), key=lambda i: results[i][0])
+        picked = candidates[best]
+        rows.append(['forward', len(picked), picked, *results[best], perf_counter() - start])
+
+    return rows
+
+
+def rfe(scores, X, y, n_features, n_jobs=N_JOBS):
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=SEED)
+    left, rows = list(range(n_features)), []
+
+    while left:
+        start = perf_counter()
+        mean, std = scores.score([left])[0]
+        dropped = None
+
+        if len(left) > 1:
+            clf = clone(scores.model).fit(X_train[:, left], y_train)
+            importance = permutation_importances(clf, X_test[:, left], y_test, n_jobs=n_jobs)
+            dropped = left[int(np.argmin(importance))]
+
+        rows.append(['rfe', len(left), list(left), mean, std, perf_counter() - start])
+        if dropped is None:
+            break
+        left.remove(dropped)
+
+    return rows
+
+
+# best subset of a previous run, as final_pmr.csv column positions
+def best_subset(path=OUTPUT_PATH, data_path=DATA_PATH):
+    ranked = pd.read_csv(path)
+    columns = list(pd.read_csv(data_path, nrows=0).columns)
+    return [columns.index(name) for name in ranked['features'][0].split(',')]
+
+
+if __name__ == "__main__":
+    method = sys.argv[1] if len(sys.argv) > 1 else 'both'
+    model = model_by_name(sys.argv[2] if len(sys.argv) > 2 else 'LogisticRegression')
+    times = []
+
+    with timed("load data", times):
+        X, y, names = load_features()
+
+    scores = SubsetScores(model, X, y, names)
+    rows = []
+
+    if method in ('forward', 'both'):
+        with timed("forward search", times):
+            rows += forward(scores, len(names))
+
+    if method in ('rfe', 'both'):
+        with timed("recursive elimination", times):
+            rows += rfe(scores, X, y, len(names))
+
+    scores.save()
+
+    output = pd.DataFrame(rows, columns=['method', 'n_features', 'columns', 'cv_accuracy', 'cv_std', 'seconds'])
+    output['features'] = [','.join(names[c] for c in columns) for columns in output.pop('columns')]
+    output['model'] = type(model).__name__
+
+    # ranked, ties go to the smaller subset
+    output.sort_values(by=['cv_accuracy', 'n_features'], ascending=[False, True], inplace=True)
+    output.reset_index(inplace=True, drop=True)
+    output.to_csv(OUTPUT_PATH, index=False)
+
+    print(output.head(10).to_string())
+    print(f"\n{scores.fitted} subsets fitted, {len(scores.cache)} cached")
+    print_times(times)
@@ -0,0 +1,264 @@
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.neighbors import BallTree, KNeighborsClassifier
+from sklearn.cluster import MiniBatchKMeans
+
+import numpy as np
+import pandas as pd
+import joblib
+import sys
+from time import perf_counter
+
+from evaluation import load_dataset
+
+# neighbour search for the KNN model (minkowski p=3 like model_testing.py)
+#
+#   brute     exact, every training row, distances computed a block of queries
+#             against a block of rows at a time so memory stays flat
+#   balltree  exact, sklearn BallTree built once and saved with the model
+#   ivf       approximate, rows are split into N_LISTS clusters and a query only
+#             looks at the rows of its N_PROBE nearest clusters. n_probe is
+#             the recall / latency knob: n_probe = n_lists is exact again
+#
+# IndexedKNN wraps any of them as a classifier that can stand in for
+# KNeighborsClassifier (make_models(knn_index=...) in evaluation.py)
+#
+# usage: python knn_index.py [rows]   benchmarks every index against brute force
+
+INDEX_PATH = 'output/knn_index.joblib'
+BENCHMARK_PATH = 'output/knn-benchmark.csv'
+
+P = 3
+N_NEIGHBORS = 5
+
+# queries and training rows per distance block, (256 x 4096 x features) floats
+BLOCK_QUERIES = 256
+BLOCK_POINTS = 4096
+
+# ivf defaults, n_lists = None picks sqrt(rows)
+N_LISTS = None
+N_PROBE = 8
+
+
+# -- BLOCKED BRUTE FORCE -- #
+
+# (queries, points) minkowski distances to the power p, no root needed to rank
+def power_distances(Q, X, p=P):
+    return (np.abs(Q[:, None, :] - X[None, :, :]) ** p).sum(axis=2)
+
+
+# keeps the k smallest of (best, new) per row
+def merge(best_d, best_i, d, i, k):
+    d = np.concatenate([best_d, d], axis=1)
+    i = np.concatenate([best_i, i], axis=1)
+    if d.shape[1] <= k:
+        return d, i
+
+    keep = np.argpartition(d, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(d, keep, 1), np.take_along_axis(i, keep, 1)
+
+
+# k nearest rows of X for every query, ids are positions in X (or in ids)
+def blocked_search(X, Q, k, p=P, ids=None):
+    best_d = np.full((len(Q), 0), np.inf)
+    best_i = np.full((len(Q), 0), -1, dtype=np.int64)
+
+    for start in range(0, len(X), BLOCK_POINTS):
+        block = X[start:start + BLOCK_POINTS]
+        block_ids = np.arange(start, start + len(block)) if ids is None else ids[start:start + len(block)]
+
+        d = np.concatenate([power_distances(Q[q:q + BLOCK_QUERIES], block, p) for q in range(0, len(Q), BLOCK_QUERIES)])
+        best_d, best_i = merge(best_d, best_i, d, np.broadcast_to(block_ids, d.shape), k)
+
+    return sort(best_d, best_i)
+
+
+def sort(d, i):
+    order = np.argsort(d, axis=1)
+    return np.take_along_axis(d, order, 1), np.take_along_axis(i, order, 1)
+
+
+# -- INDEXES -- #
+
+class BruteIndex():
+    def __init__(self, p=P):
+        self.p = p
+
+    def build(self, X):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        return self
+
+    def query(self, Q, k):
+        return blocked_search(self.X, np.asarray(Q, dtype=np.float64), k, self.p)[1]
+
+
+class BallTreeIndex():
+    def __init__(self, p=P, leaf_size=40):
+        self.p = p
+        self.leaf_size = leaf_size
+
+    def build(self, X):
+        self.tree = BallTree(np.asarray(X, dtype=np.float64), leaf_size=self.leaf_size, metric='minkowski', p=self.p)
+        return self
+
+    def query(self, Q, k):
+        return self.tree.query(np.asarray(Q, dtype=np.float64), k=k, return_distance=False)
+
+
+class IVFIndex():
+    def __init__(self, p=P, n_lists=N_LISTS, n_probe=N_PROBE, random_state=0):
+        self.p = p
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+
+    def build(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(X))))
+
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state, n_init=3, batch_size=4096)
+        kmeans.fit(X)
+        self.centroids = kmeans.cluster_centers_
+
+        # rows go to their nearest centroid under the search metric
+        labels = blocked_search(self.centroids, X, 1, self.p)[1][:, 0]
+
+        # rows stored list by list, list c is order[offsets[c]:offsets[c + 1]]
+        self.order = np.argsort(labels, kind='stable')
+        self.X = X[self.order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        return self
+
+    def query(self, Q, k, n_probe=None):
+        Q = np.asarray(Q, dtype=np.float64)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+
+        probes = blocked_search(self.centroids, Q, n_probe, self.p)[1]
+
+        best_d = np.full((len(Q), k), np.inf)
+        best_i = np.full((len(Q), k), -1, dtype=np.int64)
+
+        # one pass per list over every query probing it
+        for c in np.unique(probes):
+            queries = np.flatnonzero((probes == c).any(axis=1))
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if start == end:
+                continue
+
+            d, i = blocked_search(self.X[start:end], Q[queries], k, self.p, ids=self.order[start:end])
+            best_d[queries], best_i[queries] = merge(best_d[queries], best_i[queries], d, i, k)
+
+        return sort(best_d, best_i)[1]
+
+
+INDEXES = {'brute': BruteIndex, 'balltree': BallTreeIndex, 'ivf': IVFIndex}
+
+
+# -- CLASSIFIER -- #
+
+# majority vote of the k nearest training rows, like KNeighborsClassifier
+# with uniform weights
+class IndexedKNN(ClassifierMixin, BaseEstimator):
+    def __init__(self, index='ivf', n_neighbors=N_NEIGHBORS, p=P, n_lists=N_LISTS, n_probe=N_PROBE):
+        self.index = index
+        self.n_neighbors = n_neighbors
+        self.p = p
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+
+    def fit(self, X, y):
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+
+        self.classes_, self.y_ = np.unique(np.asarray(y), return_inverse=True)
+
+        if self.index == 'ivf':
+            self.index_ = IVFIndex(self.p, self.n_lists, self.n_probe).build(np.asarray(X))
+        else:
+            self.index_ = INDEXES[self.index](self.p).build(np.asarray(X))
+        return self
+
+    def kneighbors(self, X):
+        return self.index_.query(np.asarray(X), self.n_neighbors)
+
+    # ivf can come back with fewer than k rows (-1) when the probed lists are small
+    def predict_proba(self, X):
+        neighbors = self.kneighbors(X)
+        found = neighbors >= 0
+        votes = self.y_[neighbors]
+        counts = np.stack([((votes == c) & found).sum(axis=1) for c in range(len(self.classes_))], axis=1)
+        return counts / np.maximum(found.sum(axis=1, keepdims=True), 1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path=INDEX_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=INDEX_PATH):
+        return joblib.load(path)
+
+
+# -- BENCHMARK -- #
+
+# real matches resampled with a little noise, up to any size
+def synthetic(X, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    picked = X[rng.integers(0, len(X), rows)]
+    return picked + rng.normal(0, 0.05, picked.shape)
+
+
+def recall(found, exact):
+    return np.mean([len(np.intersect1d(f, e)) / len(e) for f, e in zip(found, exact)])
+
+
+def benchmark(rows, queries=1000, k=N_NEIGHBORS):
+    X, y = load_dataset()
+    X = X.to_numpy(dtype=np.float64)
+    y = y.to_numpy()
+
+    train = synthetic(X, rows)
+    Q = synthetic(X, queries, seed=1)
+
+    results = []
+
+    def run(name, index, **query_args):
+        start = perf_counter()
+        found = index.query(Q, k, **query_args)
+        seconds = perf_counter() - start
+        results.append([name, rows, build, seconds / queries * 1000, recall(found, exact)])
+        print(f"{name:<20} build {build:8.2f}s | {seconds / queries * 1000:8.3f} ms/query | recall {results[-1][-1]:.3f}")
+
+    start = perf_counter()
+    brute = BruteIndex().build(train)
+    build = perf_counter() - start
+    start = perf_counter()
+    exact = brute.query(Q, k)
+    seconds = perf_counter() - start
+    results.append(['brute', rows, build, seconds / queries * 1000, 1.0])
+    print(f"{'brute':<20} build {build:8.2f}s | {seconds / queries * 1000:8.3f} ms/query | recall 1.000")
+
+    start = perf_counter()
+    tree = BallTreeIndex().build(train)
+    build = perf_counter() - start
+    run('balltree', tree)
+
+    start = perf_counter()
+    ivf = IVFIndex().build(train)
+    build = perf_counter() - start
+    for n_probe in (1, 2, 4, 8, 16, 32):
+        run(f'ivf n_probe={n_probe}', ivf, n_probe=n_probe)
+
+    # the real data, same predictions as model_testing.py's KNeighborsClassifier?
+    split = int(len(X) * 0.7)
+    sk = KNeighborsClassifier(p=P, n_neighbors=k, algorithm='brute').fit(X[:split], y[:split]).predict(X[split:])
+    for index in INDEXES:
+        ours = IndexedKNN(index=index).fit(X[:split], y[:split]).predict(X[split:])
+        print(f"{index:<20} agrees with KNeighborsClassifier on {np.mean(ours == sk):.3f} of the test rows")
+
+    return pd.DataFrame(results, columns=['index', 'rows', 'build (s)', 'ms/query', 'recall'])
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    benchmark(rows).to_csv(BENCHMARK_PATH)
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+import ast
+import os
+import sys
+from itertools import chain
+
+# typed loader for the match listing files written by scraper.py
+# (data/matches_premiere.csv, matches_pmr_2.csv, matches_ofc_2.csv, or the
+# .jsonl version of them)
+#
+# pd.read_csv on its own keeps every column as python objects, the player
+# lists as one long string per team. here every column gets a fixed dtype:
+#
+#   match_id                  int64
+#   premiere_rating           int32
+#   official_rank, map        category
+#   date                      datetime64
+#   team_1_score/team_2_score int16
+#   KDA                       (matches, 3) int16
+#   team_1/team_2             (matches, 5) int32 ids into a shared PlayerNames
+#                             table, -1 where a team has fewer players
+#
+# most player names only ever appear once, so the name table is most of the
+# memory. it holds no python strings: every name is utf-8 bytes back to back
+# in one array, found again through a sorted array of 64 bit name hashes
+#
+# on the three listing files (1293 matches) pd.read_csv takes 622 B/match and
+# this loader 336 B/match, name table included, both measured with
+# DataFrame.memory_usage(deep=True) plus the arrays
+#
+# usage: python match_loader.py [csv ...]   compares the memory of both loads,
+#                                           name table included
+
+TEAM_SIZE = 5
+
+# rows per chunk for iter_matches
+CHUNK_SIZE = 10000
+
+DTYPES = {
+    'match_id': 'int64',
+    'premiere_rating': 'int32',
+    'official_rank': 'category',
+    'map': 'category',
+    'team_1_score': 'int16',
+    'team_2_score': 'int16',
+}
+
+LIST_COLUMNS = ['team_1', 'team_2', 'KDA']
+
+
+# name <-> id table shared by every chunk and file loaded with it, about
+# (name length + 20) bytes a name. two names with the same 64 bit hash would
+# share an id, at these sizes that doesn't happen
+class PlayerNames():
+    def __init__(self):
+        self.data = np.empty(0, dtype=np.uint8)     # utf-8 names back to back
+        self.offsets = np.zeros(1, dtype=np.int64)  # name i is data[offsets[i]:offsets[i + 1]]
+        self.hashes = np.empty(0, dtype=np.uint64)  # hash of every name, sorted
+        self.order = np.empty(0, dtype=np.int32)    # id of the name of each hash
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # ids of an array of names, adding the ones not seen before
+    def ids(self, names):
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        hashes = pd.util.hash_array(uniques.astype(object))
+
+        pos = np.searchsorted(self.hashes, hashes)
+        found = pos < len(self.hashes)
+        found[found] = self.hashes[pos[found]] == hashes[found]
+
+        unique_ids = np.empty(len(uniques), dtype=np.int32)
+        unique_ids[found] = self.order[pos[found]]
+        unique_ids[~found] = np.arange(len(self), len(self) + int((~found).sum()), dtype=np.int32)
+        self.add(uniques[~found], hashes[~found], unique_ids[~found])
+
+        return unique_ids[codes]
+
+    def add(self, names, hashes, ids):
+        encoded = [name.encode() for name in names]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+
+        self.data = np.concatenate([self.data, np.frombuffer(b''.join(encoded), dtype=np.uint8)])
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths)])
+
+        hashes = np.concatenate([self.hashes, hashes])
+        order = np.concatenate([self.order, ids])
+        sort = np.argsort(hashes, kind='stable')
+        self.hashes, self.order = hashes[sort], order[sort]
+
+    def name(self, id):
+        if id < 0:
+            return None
+        return self.data[self.offsets[id]:self.offsets[id + 1]].tobytes().decode()
+
+    # (matches, 5) ids of the name lists, -1 padded
+    def encode(self, teams):
+        ids = np.full((len(teams), TEAM_SIZE), -1, dtype=np.int32)
+
+        sizes = np.fromiter((min(len(team), TEAM_SIZE) for team in teams), dtype=np.int64, count=len(teams))
+        names = list(chain.from_iterable(team[:TEAM_SIZE] for team in teams))
+        if names:
+            rows = np.repeat(np.arange(len(teams)), sizes)
+            cols = np.arange(len(names)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            ids[rows, cols] = self.ids(names)
+
+        return ids
+
+    def decode(self, ids):
+        return [self.name(id) for id in ids if id >= 0]
+
+    def memory_usage(self):
+        return self.data.nbytes + self.offsets.nbytes + self.hashes.nbytes + self.order.nbytes
+
+
+# one file (or chunk of it): typed scalar columns + player id arrays
+class Matches():
+    def __init__(self, frame, team_1, team_2, kda, names):
+        self.frame = frame
+        self.team_1 = team_1
+        self.team_2 = team_2
+        self.kda = kda
+        self.names = names
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def match_id(self):
+        return self.frame['match_id'].to_numpy()
+
+    # player names of one row
+    def team(self, row, side=1):
+        return self.names.decode((self.team_1 if side == 1 else self.team_2)[row])
+
+    # back to the layout pd.read_csv gave, with the teams as name lists
+    def to_frame(self):
+        frame = self.frame.copy()
+        frame['team_1'] = [self.names.decode(team) for team in self.team_1]
+        frame['team_2'] = [self.names.decode(team) for team in self.team_2]
+        frame['KDA'] = [[str(v) for v in kda] for kda in self.kda]
+        return frame
+
+    # bytes held by this chunk, with names=True also the whole shared name table
+    def memory_usage(self, names=False):
+        usage = int(self.frame.memory_usage(deep=True).sum()) + self.team_1.nbytes + self.team_2.nbytes + self.kda.nbytes
+        return usage + self.names.memory_usage() if names else usage
+
+
+# -- PARSING -- #
+
+def as_list(value):
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value:
+        return []
+    return ast.literal_eval(value)
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def typed(chunk, names):
+    teams = {column: [as_list(v) for v in chunk.pop(column)] for column in LIST_COLUMNS if column in chunk}
+
+    kda = np.full((len(chunk), 3), -1, dtype=np.int16)
+    for i, values in enumerate(teams.get('KDA', [])):
+        kda[i, :len(values[:3])] = [to_int(v) for v in values[:3]]
+
+    chunk['date'] = pd.to_datetime(chunk['date'], format='ISO8601')
+    for column, dtype in DTYPES.items():
+        if column in chunk:
+            chunk[column] = chunk[column].astype(dtype)
+
+    empty = [[]]*len(chunk)
+    return Matches(
+        chunk.reset_index(drop=True),
+        names.encode(teams.get('team_1', empty)),
+        names.encode(teams.get('team_2', empty)),
+        kda,
+        names,
+    )
+
+
+def read(path, chunksize=None):
+    if path.endswith('.jsonl'):
+        return pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+
+    # the list columns are parsed afterwards, the rest gets its dtype while reading
+    dtype = {column: dtype for column, dtype in DTYPES.items() if dtype != 'category'}
+    return pd.read_csv(path, index_col=0, dtype=dtype, chunksize=chunksize)
+
+
+# -- LOADING -- #
+
+def load_matches(path, names=None):
+    return typed(read(path), names if names is not None else PlayerNames())
+
+
+# Matches of at most chunksize rows at a time, all sharing one name table.
+# categories are per chunk, compare them as strings across chunks
+def iter_matches(path, chunksize=CHUNK_SIZE, names=None):
+    names = names if names is not None else PlayerNames()
+    for chunk in read(path, chunksize):
+        yield typed(chunk, names)
+
+
+# only the match ids, the cheapest load there is
+def match_ids(path):
+    if path.endswith('.jsonl'):
+        return np.concatenate([chunk.match_id for chunk in iter_matches(path)] or [np.empty(0, dtype=np.int64)])
+    return pd.read_csv(path, usecols=['match_id'], dtype={'match_id': 'int64'})['match_id'].to_numpy()
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or ['data/matches_premiere.csv', 'data/matches_pmr_2.csv', 'data/matches_ofc_2.csv']
+    paths = [path for path in paths if os.path.exists(path)]
+
+    # memory_usage(deep=True) counts the string storage of the frames, which
+    # tracemalloc doesn't see. the shared name table is counted once
+    plain = [pd.read_csv(path, index_col=0) for path in paths]
+    plain_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in plain)
+
+    names = PlayerNames()
+    typed_loads = [load_matches(path, names) for path in paths]
+    typed_bytes = sum(matches.memory_usage() for matches in typed_loads) + names.memory_usage()
+
+    n = sum(len(matches) for matches in typed_loads)
+    print(f"{n} matches | pandas {plain_bytes / n:.0f} B/match | typed {typed_bytes / n:.0f} B/match (name table included)")
+    print(f"{len(names)} player names, table {names.memory_usage()} B")
@@ -0,0 +1,162 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import contextmanager
+from collections import defaultdict
+from time import perf_counter
+import threading
+import os
+
+# counters and timing histograms for the scrapers, written out in the
+# prometheus text format so they can be read as a file or scraped over http
+#
+#   scraper_page_seconds{page, phase}     histogram, phase is
+#                                         load  - driver.get / refresh until the parsed elements are there
+#                                         parse - reading the values out of the page
+#                                         write - appending to the output files
+#   scraper_elements_parsed_total{page}   values read from the pages
+#   scraper_elements_per_second{page}     the above over the time spent parsing
+#   scraper_errors_total{page, error}     failed page loads by exception type
+#   scraper_retries_total{page}           page loads handed out again
+#   scraper_rows_written_total{output}
+#   scraper_queue_pending{queue}          matches waiting in a deep stats queue
+#   player_cache_hits_total / player_cache_misses_total / player_cache_hit_ratio
+#
+# comparing the load, parse and write sums shows where a crawl spends its time
+
+# upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram():
+    def __init__(self):
+        self.counts = [0]*len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+# shared by every worker thread, all updates go through one lock
+class Metrics():
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram) # (page, phase) -> Histogram
+        self.counters = defaultdict(float)       # (name, labels) -> value
+        self.gauges = {}                          # (name, labels) -> value
+
+    # -- RECORDING -- #
+
+    @contextmanager
+    def timer(self, page, phase):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(page, phase, perf_counter() - start)
+
+    def observe(self, page, phase, seconds):
+        with self.lock:
+            self.histograms[(page, phase)].observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def parsed(self, page, elements):
+        self.inc('scraper_elements_parsed_total', elements, page=page)
+
+    def error(self, page, exception):
+        self.inc('scraper_errors_total', page=page, error=type(exception).__name__)
+
+    def retry(self, page):
+        self.inc('scraper_retries_total', page=page)
+
+    def rows(self, output, count=1):
+        self.inc('scraper_rows_written_total', count, output=output)
+
+    # hit / miss counts of a PlayerCache
+    def cache(self, cache, **labels):
+        lookups = cache.hits + cache.misses
+        self.set('player_cache_hits_total', cache.hits, **labels)
+        self.set('player_cache_misses_total', cache.misses, **labels)
+        self.set('player_cache_hit_ratio', cache.hits / lookups if lookups else 0, **labels)
+
+    # -- EXPORT -- #
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            lines.append('# TYPE scraper_page_seconds histogram')
+            for (page, phase), h in sorted(self.histograms.items()):
+                labels = f'page="{page}",phase="{phase}"'
+                for bound, count in zip(BUCKETS, h.counts):
+                    lines.append(f'scraper_page_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'scraper_page_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'scraper_page_seconds_sum{{{labels}}} {h.sum:.6f}')
+                lines.append(f'scraper_page_seconds_count{{{labels}}} {h.count}')
+
+            # elements per second of parse time
+            rates = {}
+            for (name, labels), value in self.counters.items():
+                if name == 'scraper_elements_parsed_total':
+                    page = dict(labels)['page']
+                    seconds = self.histograms[(page, 'parse')].sum if (page, 'parse') in self.histograms else 0
+                    rates[('scraper_elements_per_second', labels)] = value / seconds if seconds else 0
+
+            for kind, values in (('counter', self.counters), ('gauge', {**self.gauges, **rates})):
+                last = None
+                for (name, labels), value in sorted(values.items()):
+                    if name != last:
+                        lines.append(f'# TYPE {name} {kind}')
+                        last = name
+                    label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f'{name}{{{label_text}}} {value:g}' if label_text else f'{name} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+    # replaces the metrics file in one step, readers never see half of it
+    def write(self, path=None):
+        path = path or self.path
+        if path is None:
+            return
+
+        # a temp file per thread, several threads can write at once
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp, 'w') as f:
+            f.write(self.render())
+        os.replace(temp, path)
+
+    # GET /metrics on 127.0.0.1:port from a background thread
+    def serve(self, port):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                data = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,118 @@
+# Hyperparameter search
+
+from sklearn.model_selection import StratifiedKFold, GridSearchCV
+from sklearn.experimental import enable_halving_search_cv
+from sklearn.model_selection import HalvingGridSearchCV
+from sklearn.metrics import make_scorer, log_loss
+
+import pandas as pd
+import numpy as np
+
+from evaluation import make_models, load_dataset, timed, print_times
+
+# stratified k-fold search over each model's parameters, on all cores.
+# "grid" tries every candidate on every fold, "halving" starts all candidates
+# on a small share of the data and only keeps the best third each round
+SEARCH = "grid"
+FOLDS = 5
+N_JOBS = -1
+
+OUTPUT_PATH = 'output/search-output.csv'
+
+param_grids = {
+    'SVC': {
+        'C': [0.01, 0.1, 1, 10],
+        'kernel': ['linear', 'rbf'],
+    },
+    'LogisticRegression': {
+        'C': [0.01, 0.1, 1, 10],
+        # 0 = l2, 1 = l1 penalty (penalty= is deprecated since scikit-learn 1.8),
+        # liblinear takes both
+        'l1_ratio': [0, 1],
+    },
+    'RandomForestClassifier': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+    },
+    'KNeighborsClassifier': {
+        'n_neighbors': [3, 5, 7, 9, 15],
+        'p': [1, 2, 3],
+        'weights': ['uniform', 'distance'],
+    },
+}
+
+# same metrics as accuracy-output (log loss on the predicted labels, like model_testing.py)
+scoring = {
+    'accuracy_score': 'accuracy',
+    'balanced_acc_score': 'balanced_accuracy',
+    'precision_score': 'precision',
+    'recall_score': 'recall',
+    'f_score': 'f1',
+    'roc_auc': 'roc_auc',
+    'log_loss': make_scorer(log_loss, greater_is_better=False),
+}
+
+times = []
+
+with timed("load data", times):
+    features, label = load_dataset()
+
+    # one contiguous float array and one set of fold indices for every search,
+    # so candidates share the data instead of re-splitting and copying it
+    X = np.ascontiguousarray(features.to_numpy(dtype=np.float64))
+    y = label.to_numpy()
+    folds = list(StratifiedKFold(n_splits=FOLDS, shuffle=True, random_state=42).split(X, y))
+
+results = []
+
+# models run one after another, their candidates and folds run on every core
+for clf in make_models(n_jobs=1):
+    name = type(clf).__name__
+
+    if SEARCH == "halving":
+        # halving needs a single metric to rank candidates by
+        search = HalvingGridSearchCV(clf, param_grids[name], cv=folds, scoring='accuracy', n_jobs=N_JOBS, random_state=42)
+    else:
+        search = GridSearchCV(clf, param_grids[name], cv=folds, scoring=scoring, refit=False, n_jobs=N_JOBS)
+
+    with timed(f"search {name}", times):
+        search.fit(X, y)
+
+    cv = pd.DataFrame(search.cv_results_)
+    if SEARCH == "halving":
+        # only the candidates that made it to the last round were scored on all the data
+        cv = cv[cv['iter'] == cv['iter'].max()].rename(columns={
+            'mean_test_score': 'mean_test_accuracy_score',
+            'std_test_score': 'std_test_accuracy_score',
+        })
+
+    for _, row in cv.iterrows():
+        result = {'model_name': name}
+        for metric in scoring:
+            if f'mean_test_{metric}' in row:
+                mean = row[f'mean_test_{metric}']
+                # sklearn negates losses so that bigger is always better
+                result[metric] = -mean if metric == 'log_loss' else mean
+                result[f'{metric}_std'] = row[f'std_test_{metric}']
+        result['fit_time'] = row['mean_fit_time']
+        result['fit_time_std'] = row['std_fit_time']
+        result['score_time'] = row['mean_score_time']
+        result['params'] = row['params']
+        results.append(result)
+
+    print(f"model: {name}, {len(cv)} candidates")
+
+
+# DATA OUTPUTS
+
+search_df = pd.DataFrame(results)
+search_df.sort_values(by=['model_name', 'accuracy_score'], ascending=[True, False], inplace=True)
+search_df.reset_index(inplace=True, drop=True)
+
+# best candidate of every model
+print(search_df.groupby('model_name', sort=False).head(1)[['model_name', 'accuracy_score', 'accuracy_score_std', 'fit_time', 'score_time', 'params']])
+
+search_df.to_csv(OUTPUT_PATH)
+
+print_times(times)
@@ -0,0 +1,201 @@
+from sklearn.linear_model import SGDClassifier, LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+import numpy as np
+import pandas as pd
+import joblib
+import os
+import sys
+from collections import deque
+from time import perf_counter
+
+from build_features import FEATURES, STORE_PATH, RAW_PATH, SCALER_PATH, update_raw, load_raw, fit_scaler, load_scaler
+from evaluation import PRUNED
+from stats_store import open_store
+from predictor import Predictor
+
+# incremental training, keeps the models of the last run and folds in only
+# the matches added since then, so an update costs the new matches and not
+# the whole history
+#
+#   SGDClassifier           logistic regression by sgd, partial_fit on the new rows
+#   RandomForestClassifier  warm started, TREES_PER_UPDATE new trees grown on the
+#                           new rows, the oldest trees are dropped past MAX_TREES
+#   LogisticRegression      the model_testing.py baseline, refit on every row
+#
+# every new match is first predicted by the models as they were (test then
+# train), the last WINDOW of those predictions give the rolling accuracy
+#
+# usage: python online_training.py [--reset]
+#   --reset forgets the saved state and starts over from the first match
+
+STATE_PATH = 'output/online_state.joblib'
+MODEL_PATH = 'output/online_model.joblib'
+
+# model saved for predict_service.py / pipeline.py after every update
+SAVED_MODEL = 'SGDClassifier'
+
+# newest predictions the rolling accuracy is taken over
+WINDOW = 200
+
+TREES_PER_UPDATE = 10
+MAX_TREES = 200
+
+# fewer new rows than this are held back from the forest until the next update
+MIN_FOREST_ROWS = 20
+
+# model_testing.py feature columns, PRUNED are positions in final_pmr.csv
+# (index, match_id, then FEATURES)
+FEATURE_NAMES = [FEATURES[p - 2] for p in PRUNED]
+COLUMNS = [FEATURES.index(name) for name in FEATURE_NAMES]
+
+
+def make_models():
+    return {
+        'SGDClassifier': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'RandomForestClassifier': RandomForestClassifier(n_estimators=0, warm_start=True, random_state=42),
+        'LogisticRegression': LogisticRegression(solver='liblinear', random_state=42),
+    }
+
+
+# -- STATE -- #
+
+# scaling is frozen at the first run so old and new rows stay comparable
+def new_state(raw):
+    if os.path.exists(SCALER_PATH):
+        mean, std = load_scaler(SCALER_PATH)
+    else:
+        mean, std = fit_scaler(raw)
+
+    return {
+        'position': 0,     # rows of data/features_pmr/ already trained on
+        'last_id': None,   # match id at position - 1, to notice a rebuilt cache
+        'mean': mean,
+        'std': std,
+        'models': make_models(),
+        'rows': {name: 0 for name in make_models()},
+        'pending': (np.empty((0, len(COLUMNS))), np.empty(0, dtype=int)),
+        'history': {name: deque(maxlen=WINDOW) for name in make_models()},
+    }
+
+
+def load_state(path=STATE_PATH):
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+def save_state(state, path=STATE_PATH):
+    joblib.dump(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+# the raw feature cache is append only, unless build_features.py --full
+# rebuilt it in another order
+def consistent(state, ids):
+    position = state['position']
+    return position <= len(ids) and (position == 0 or ids[position - 1] == state['last_id'])
+
+
+# -- UPDATES -- #
+
+def fitted(model):
+    return hasattr(model, 'classes_')
+
+
+def update_sgd(model, X, y):
+    model.partial_fit(X, y, classes=[0, 1])
+
+
+def update_forest(model, X, y, state):
+    X = np.concatenate([state['pending'][0], X])
+    y = np.concatenate([state['pending'][1], y])
+
+    if len(y) < MIN_FOREST_ROWS or len(np.unique(y)) < 2:
+        state['pending'] = (X, y)
+        return 0
+
+    model.n_estimators += TREES_PER_UPDATE
+    model.fit(X, y)
+
+    if len(model.estimators_) > MAX_TREES:
+        del model.estimators_[:len(model.estimators_) - MAX_TREES]
+        model.n_estimators = MAX_TREES
+
+    state['pending'] = (np.empty((0, X.shape[1])), np.empty(0, dtype=int))
+    return len(y)
+
+
+# the baseline has no incremental fit, it sees every row again
+def update_baseline(model, X_all, y_all):
+    if len(np.unique(y_all)) < 2:
+        return 0
+    model.fit(X_all, y_all)
+    return len(y_all)
+
+
+# -- RUN -- #
+
+# model input of the complete rows among rows (a team without stats can't be used)
+def model_input(state, raw, winner, rows):
+    rows = rows[~np.isnan(raw[rows]).any(axis=1)]
+    return ((raw[rows] - state['mean']) / state['std'])[:, COLUMNS], winner[rows].astype(int)
+
+
+# folds raw[rows] into every model
+def update(state, raw, winner, rows):
+    X, y = model_input(state, raw, winner, rows)
+
+    report = []
+    for name, model in state['models'].items():
+        start = perf_counter()
+
+        # test then train, only models that have been fitted can be scored
+        if fitted(model) and len(y):
+            state['history'][name].extend(model.predict(X) == y)
+
+        if name == 'SGDClassifier':
+            if len(y):
+                update_sgd(model, X, y)
+                state['rows'][name] += len(y)
+        elif name == 'RandomForestClassifier':
+            if len(y) or len(state['pending'][1]):
+                state['rows'][name] += update_forest(model, X, y, state)
+        elif len(y):
+            state['rows'][name] = update_baseline(model, *model_input(state, raw, winner, np.arange(len(raw))))
+
+        history = state['history'][name]
+        report.append([
+            name,
+            state['rows'][name],
+            perf_counter() - start,
+            np.mean(history) if history else np.nan,
+            len(history),
+        ])
+
+    return len(y), pd.DataFrame(report, columns=['model', 'rows trained', 'update (s)', 'rolling accuracy', 'window'])
+
+
+if __name__ == "__main__":
+    # pulls in whatever the scrapers added to the stats store
+    update_raw(open_store(STORE_PATH), RAW_PATH)
+    ids, raw, winner = load_raw(RAW_PATH)
+
+    state = None if '--reset' in sys.argv else load_state()
+    if state is not None and not consistent(state, ids):
+        print("feature cache was rebuilt since the last run, starting over")
+        state = None
+    if state is None:
+        state = new_state(raw)
+
+    added, report = update(state, raw, winner, np.arange(state['position'], len(ids)))
+
+    state['position'] = len(ids)
+    state['last_id'] = int(ids[-1]) if len(ids) else None
+    save_state(state)
+
+    print(f"{added} new matches folded in, {len(ids)} total")
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+    model = state['models'][SAVED_MODEL]
+    if fitted(model):
+        Predictor(model, FEATURE_NAMES, state['mean'], state['std']).save(MODEL_PATH)
+        print(f"saved {SAVED_MODEL} to {MODEL_PATH}")
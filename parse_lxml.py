@@ -0,0 +1,257 @@
+from lxml import etree, html
+from urllib.parse import urljoin
+
+# fast extraction backend, parses the whole page html in one go instead of
+# asking the browser for every element. takes the html from
+# driver.page_source or any http client, and follows the same parsing rules
+# as parse_selenium.py
+
+BASE_URL = "https://csstats.gg"
+
+# -- COMPILED SELECTORS -- #
+
+# match listing
+X_LISTING_ROWS = etree.XPath('//table[@class="table table-striped"]//tr')
+X_CELLS = etree.XPath('.//td')
+X_DIVS = etree.XPath('.//div')
+X_SPANS = etree.XPath('.//span')
+X_IMGS = etree.XPath('.//img')
+X_LINKS = etree.XPath('.//a')
+
+# match page
+X_SCORES = etree.XPath('//span[@class="team-score-number"]')
+X_MAP = etree.XPath('//div[@class="flex flex-wrap "]/div[3]/img')
+X_TABLE = etree.XPath('(//table)[1]')
+X_TBODIES = etree.XPath('.//tbody')
+X_ROWS = etree.XPath('.//tr')
+
+# player profile
+X_RANKS = etree.XPath('//div[@class="ranks"]')
+X_KD = etree.XPath('//div[@class="col-sm-8"]/div[1]/div[1]/div/div[2]/div[2]/div/span')
+X_HLTVR = etree.XPath('//div[@class="col-sm-8"]/div[1]/div[2]/div/div[2]/div[2]/div/span')
+X_WR = etree.XPath('//div[@class="col-sm-8"]/div[1]/div[3]/div/div[2]/div[2]')
+X_HS = etree.XPath('//div[@class="col-sm-8"]/div[1]/div[4]/div/div[2]/div[2]')
+X_ADR = etree.XPath('//div[@class="col-sm-8"]/div[1]/div[5]/div/div[2]/div[2]')
+X_CS = etree.XPath('//div[@class="col-sm-8"]/div[2]/div/div[1]/div[2]/div/span[2]')
+X_ES = etree.XPath('//div[@class="col-sm-8"]/div[2]/div/div[2]/div[2]/div/span[2]')
+
+# maps tab
+X_MAPS = etree.XPath('//div[@class="content-tab current-tab"]/div/div')
+X_PLAY_COUNT = etree.XPath('./div[@style="float:left; padding-top:22px; width:20%"]')
+
+
+# elements selenium's .text leaves out. hiding done by a css class can't be
+# seen from the html alone
+HIDDEN_TAGS = {'script', 'style', 'template', 'noscript'}
+
+
+def hidden(el):
+    style = (el.get('style') or '').replace(' ', '').lower()
+    return el.tag in HIDDEN_TAGS or el.get('hidden') is not None or 'display:none' in style or 'visibility:hidden' in style
+
+
+# rendered text of an element and its children, hidden ones and comments skipped
+def visible_text(el):
+    if hidden(el):
+        return
+    if el.text:
+        yield el.text
+
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from visible_text(child)
+        if child.tail:
+            yield child.tail
+
+
+# same text and whitespace handling as selenium's .text
+def text(el):
+    return ' '.join(''.join(visible_text(el)).split())
+
+
+# first match of a selector, missing elements raise like find_element does
+def first(selector, el):
+    found = selector(el)
+    if not found:
+        raise LookupError(f"no element for {selector.path}")
+    return found[0]
+
+
+def parse(source):
+    if isinstance(source, (str, bytes)):
+        return html.fromstring(source)
+    return source
+
+
+# -- MATCH LISTING -- #
+
+# one dict per competitive match in the /match table, rows whose id makes
+# skip(match_id) true are not parsed
+def parse_listing(source, skip=None):
+    matches = []
+
+    for row in X_LISTING_ROWS(parse(source))[1:]: # skips header row
+        cells = X_CELLS(row)
+
+        # match_id
+        match_id = int(row.get('onclick').split('/')[2][:-1])
+        if skip is not None and skip(match_id):
+            continue
+
+        match = {'match_id': match_id}
+
+        # premiere rating / official rank / none
+        if X_DIVS(cells[1]):
+            match['premiere_rating'] = int(text(first(X_SPANS, cells[1])).replace(',',''))
+
+        elif X_IMGS(cells[1]):
+            match['official_rank'] = first(X_IMGS, cells[1]).get('title')
+
+        else: # ignore all non-competitive matches
+            continue
+
+        # map
+        imgs = X_IMGS(cells[4])
+        match['map'] = imgs[0].get('title') if imgs else text(cells[4])
+
+        # teams
+        match['team_1'] = [elm.get('title') for elm in X_IMGS(cells[5])]
+        match['team_2'] = [elm.get('title') for elm in X_IMGS(cells[8])]
+
+        # scores
+        match['team_1_score'] = text(cells[6])
+        match['team_2_score'] = text(cells[7])
+
+        # KDA
+        match['KDA'] = [text(cells[9]), text(cells[10]), text(cells[11])]
+
+        matches.append(match)
+
+    return matches
+
+
+# -- MATCH PAGE -- #
+
+# winner, map and the profile link of every player on the scoreboard
+def parse_match(source):
+    doc = parse(source)
+
+    # checks if t1 win or lose
+    scores = X_SCORES(doc)
+    winner = "team_1" if int(text(scores[0])) >= int(text(scores[1])) else "team_2"
+
+    # get map
+    match_map = first(X_MAP, doc).get('title')
+
+    # getting link to each player stats
+    player_links = []
+
+    tbodies = X_TBODIES(first(X_TABLE, doc)) # tbody[0] = t1, tbody[2] = t2
+
+    for tbody in (tbodies[0], tbodies[2]):
+        for row in X_ROWS(tbody)[1:]:
+            links = X_LINKS(row)
+            if not links:
+                print("Player is missing")
+                continue
+
+            # selenium hands back the resolved href, the raw attribute may be relative
+            player_links.append(urljoin(BASE_URL, links[0].get('href')))
+
+    return winner, match_map, player_links
+
+
+# -- PLAYER PROFILE -- #
+
+# text of a single stat block
+def stat(selector, doc):
+    return text(first(selector, doc))
+
+
+# [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es]
+def parse_profile(source):
+    doc = parse(source)
+
+    current_rating = 0
+    best_rating = 0
+
+    # player ratings
+    for p in X_RANKS(doc):
+        if first(X_IMGS, p).get('title') == "Premier":
+            overs = X_DIVS(first(X_DIVS, p))
+
+            # current rating
+            try:
+                current_rating = int(text(overs[1]).replace(',',''))
+            except Exception:
+                current_rating = 0
+
+            # best rating
+            try:
+                best_rating = int(text(overs[-1]).replace(',',''))
+            except Exception:
+                best_rating = current_rating
+
+            break
+
+    # KD
+    try:
+        kd = float(stat(X_KD, doc))
+    except ValueError:
+        kd = float(0)
+
+    # HLTV rating
+    try:
+        hltvr = float(stat(X_HLTVR, doc))
+    except ValueError:
+        hltvr = float(0)
+
+    # WR (win rate)
+    try:
+        wr = float(stat(X_WR, doc).replace(' ','').split('%')[0])/100
+    except ValueError:
+        wr = float(0)
+
+    # HSp (head shots percentage)
+    try:
+        hs = float(stat(X_HS, doc).replace(' ','').split('%')[0])/100
+    except ValueError:
+        hs = float(0)
+
+    # ADR
+    try:
+        adr = float(stat(X_ADR, doc)[:-1])/100
+    except ValueError:
+        adr = float(0)
+
+    # CSp (clutch success)
+    try:
+        cs = float(stat(X_CS, doc)[:-1])/100
+    except ValueError:
+        cs = float(0)
+
+    # ESp (entry success)
+    try:
+        es = float(stat(X_ES, doc)[:-1])/100
+    except ValueError:
+        es = float(0)
+
+    return [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es]
+
+
+# -- MAPS TAB -- #
+
+# {map_title: [win_rate, play_count]}
+def parse_maps(source):
+    map_table = {}
+
+    for map in X_MAPS(parse(source))[1:]:
+        map_title = text(first(X_SPANS, map))
+        map_stat = first(X_DIVS, map)
+
+        win_rate = int(text(X_DIVS(map_stat)[2])[:-1])/100
+        played = int(text(first(X_PLAY_COUNT, map_stat)))
+
+        map_table[map_title] = [win_rate, played]
+
+    return map_table
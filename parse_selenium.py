@@ -0,0 +1,206 @@
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+from driver_factory import wait_for
+
+# old extraction backend, reads every value straight from the live page
+# (one webdriver round trip per element). parse_lxml.py has the same
+# functions working on the page html instead
+
+# xpath of the element each page is parsed from
+LISTING_XPATH = '//table[@class="table table-striped"]'
+MATCH_XPATH = '//span[@class="team-score-number"]'
+PROFILE_XPATH = '//div[@class="col-sm-8"]'
+MAPS_XPATH = '//div[@class="content-tab current-tab"]'
+
+# elements that have to be rendered before a page can be parsed, the drivers
+# don't wait implicitly so every parse waits on these first
+LISTING_WAIT = (LISTING_XPATH + '//tr',)
+MATCH_WAIT = (MATCH_XPATH, '//div[@class="flex flex-wrap "]/div[3]/img', '//table/tbody')
+PROFILE_WAIT = (PROFILE_XPATH + '/div[1]/div[5]', PROFILE_XPATH + '/div[2]')
+MAPS_WAIT = (MAPS_XPATH,)
+
+
+# waits for the elements we parse and returns the rendered html
+def page_source(driver, xpaths, timeout=10):
+    wait_for(driver, xpaths, timeout)
+    return driver.page_source
+
+
+# -- MATCH LISTING -- #
+
+# one dict per competitive match in the /match table, rows whose id makes
+# skip(match_id) true are not parsed
+def parse_listing(driver, skip=None):
+    matches = []
+
+    # selecting table
+    table = driver.find_element(by=By.XPATH, value=LISTING_XPATH)
+
+    # selecting rows
+    rows = table.find_elements(by=By.TAG_NAME, value='tr')
+
+    # selecting columns/cells
+    for row in rows[1:]: # skips header row
+        cells = row.find_elements(By.TAG_NAME, value='td')
+
+        # match_id
+        match_id = int(row.get_attribute('onclick').split('/')[2][:-1])
+        if skip is not None and skip(match_id):
+            continue
+
+        match = {'match_id': match_id}
+
+        # premiere rating / official rank / none
+        if len(cells[1].find_elements(By.TAG_NAME, 'div')) > 0:
+            match['premiere_rating'] = int(cells[1].find_element(By.TAG_NAME, 'span').text.replace(',',''))
+
+        elif len(cells[1].find_elements(By.TAG_NAME, 'img')) > 0:
+            match['official_rank'] = cells[1].find_element(By.TAG_NAME, 'img').get_attribute('title')
+
+        else: # ignore all non-competitive matches
+            continue
+
+        # map
+        try:
+            match['map'] = cells[4].find_element(By.TAG_NAME, 'img').get_attribute('title')
+        except NoSuchElementException:
+            match['map'] = cells[4].text
+
+        # teams
+        match['team_1'] = [elm.get_attribute('title') for elm in cells[5].find_elements(By.TAG_NAME, 'img')]
+        match['team_2'] = [elm.get_attribute('title') for elm in cells[8].find_elements(By.TAG_NAME, 'img')]
+
+        # scores
+        match['team_1_score'] = cells[6].text
+        match['team_2_score'] = cells[7].text
+
+        # KDA
+        match['KDA'] = [cells[9].text, cells[10].text, cells[11].text]
+
+        matches.append(match)
+
+    return matches
+
+
+# -- MATCH PAGE -- #
+
+# winner, map and the profile link of every player on the scoreboard
+def parse_match(driver):
+    # checks if t1 win or lose
+    scores = driver.find_elements(By.XPATH, MATCH_XPATH)
+    winner = "team_1" if int(scores[0].text) >= int(scores[1].text) else "team_2"
+
+    # get map
+    match_map = driver.find_element(By.XPATH, '//div[@class="flex flex-wrap "]/div[3]/img').get_attribute('title')
+
+    # getting link to each player stats
+    player_links = []
+
+    table = driver.find_element(By.TAG_NAME, "table")
+    tbodies = table.find_elements(By.TAG_NAME, "tbody") # tbody[0] = t1, tbody[2] = t2
+
+    for tbody in (tbodies[0], tbodies[2]):
+        rows = tbody.find_elements(By.TAG_NAME, "tr")
+        for row in rows[1:]:
+            try:
+                player_links.append(row.find_element(By.TAG_NAME, "a").get_attribute("href"))
+            except NoSuchElementException:
+                print("Player is missing")
+                continue
+
+    return winner, match_map, player_links
+
+
+# -- PLAYER PROFILE -- #
+
+# [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es]
+def parse_profile(driver):
+    player_ranks = driver.find_elements(By.XPATH, '//div[@class="ranks"]')
+
+    current_rating = 0
+    best_rating = 0
+
+    # player ratings
+    for p in player_ranks:
+        if p.find_element(By.TAG_NAME, "img").get_attribute("title") == "Premier":
+            over = p.find_element(By.TAG_NAME, 'div')
+            overs = over.find_elements(By.TAG_NAME,'div')
+
+            # current rating
+            try:
+                current_rating = int(overs[1].text.replace(',',''))
+            except Exception:
+                current_rating = 0
+
+            # best rating
+            try:
+                best_rating = int(overs[-1].text.replace(',',''))
+            except Exception:
+                best_rating = current_rating
+
+            break
+
+    # KD
+    try:
+        kd = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[1]/div/div[2]/div[2]/div/span').text)
+    except ValueError:
+        kd = float(0)
+
+    # HLTV rating
+    try:
+        hltvr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[2]/div/div[2]/div[2]/div/span').text)
+    except ValueError:
+        hltvr = float(0)
+
+    # WR (win rate)
+    try:
+        wr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[3]/div/div[2]/div[2]').text.replace('\n','').replace(' ','').split('%')[0])/100
+    except ValueError:
+        wr = float(0)
+
+    # HSp (head shots percentage)
+    try:
+        hs = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[4]/div/div[2]/div[2]').text.replace('\n','').replace(' ','').split('%')[0])/100
+    except ValueError:
+        hs = float(0)
+
+    # ADR
+    try:
+        adr = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[1]/div[5]/div/div[2]/div[2]').text[:-1])/100
+    except ValueError:
+        adr = float(0)
+
+    # CSp (clutch success)
+    try:
+        cs = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[2]/div/div[1]/div[2]/div/span[2]').text[:-1])/100
+    except ValueError:
+        cs = float(0)
+
+    # ESp (entry success)
+    try:
+        es = float(driver.find_element(By.XPATH, '//div[@class="col-sm-8"]/div[2]/div/div[2]/div[2]/div/span[2]').text[:-1])/100
+    except ValueError:
+        es = float(0)
+
+    return [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es]
+
+
+# -- MAPS TAB -- #
+
+# {map_title: [win_rate, play_count]}
+def parse_maps(driver):
+    maps = driver.find_elements(By.XPATH, MAPS_XPATH + '/div/div')[1:]
+
+    map_table = {}
+
+    for map in maps:
+        map_title = map.find_element(By.TAG_NAME, 'span').text
+        map_stat = map.find_element(By.TAG_NAME, 'div')
+
+        win_rate = int(map_stat.find_elements(By.TAG_NAME, 'div')[2].text[:-1])/100
+        played = int(map_stat.find_element(By.XPATH, './div[@style="float:left; padding-top:22px; width:20%"]').text)
+
+        map_table[map_title] = [win_rate, played]
+
+    return map_table
@@ -0,0 +1,203 @@
+from selenium.common.exceptions import NoSuchWindowException
+
+import pandas as pd
+import threading
+import queue
+
+import parse_selenium
+import parse_lxml
+from deep_scraper import create_driver, scrape_match, scrape_profile, player_stats, metrics
+from player_cache import PlayerCache, map_bias
+from seen_index import SeenIndex
+from stats_store import open_store
+from storage import RowSink, PMR_COLUMNS, OFC_COLUMNS
+from predictor import Predictor, MODEL_PATH
+
+# streaming mode: every new match on the listing goes straight through
+#
+#   listing poll -> player stats -> team difference features -> model score
+#
+# the listing is polled in its own thread and hands matches over through a
+# small bounded queue, the other stages are generators that take one record
+# at a time, so nothing grows with the length of the history
+#
+# usage: python pipeline.py
+
+LINK = "https://csstats.gg/match"
+
+# seconds between listing polls
+POLL_INTERVAL = 5
+
+# matches waiting for the stats stage, the poller blocks when it is full
+QUEUE_SIZE = 20
+
+PREDICTIONS_PATH = 'output/predictions.csv'
+PREDICTION_COLUMNS = ['match_id', 'team_1_win', 'predicted', 'winner']
+
+
+# -- STAGES -- #
+
+# listing poller thread, saves every new match and queues the premiere ones.
+# a failed poll (listing wait timeout, refresh error, ...) is counted and the
+# page reloaded, only a closed window or stopping ends the pipeline
+def poll_listing(matches, seen, sinks, stopping):
+    driver = create_driver()
+    reload = False
+
+    try:
+        while not stopping.is_set():
+            try:
+                if reload:
+                    driver.refresh()
+                reload = True
+                page = parse_selenium.page_source(driver, parse_selenium.LISTING_WAIT)
+
+                for match in parse_lxml.parse_listing(page, skip=lambda id: id in seen):
+                    seen.add(match['match_id'])
+                    match['date'] = pd.to_datetime('now')
+
+                    if 'premiere_rating' in match:
+                        sinks['pmr'].write(match)
+                        matches.put(match)
+                    else:
+                        sinks['ofc'].write(match)
+
+            except NoSuchWindowException:
+                raise
+
+            except Exception as e:
+                metrics.error("listing", e)
+                metrics.retry("listing")
+                print(f"listing failed ({type(e).__name__}), reloading page. . .")
+
+            stopping.wait(POLL_INTERVAL)
+
+    except NoSuchWindowException:
+        print("Closing Session")
+    finally:
+        matches.put(None)
+        driver.quit()
+
+
+def queued(matches):
+    while True:
+        match = matches.get()
+        if match is None:
+            return
+        yield match
+
+
+# match -> (match_id, map_bias, players_stats, winner), also saved to the stats store.
+# the driver is restarted after a failed match, like deep_scraper.worker does,
+# so one browser crash doesn't fail every match after it
+def player_stage(matches, cache, store, scraped):
+    driver = None
+
+    try:
+        for match in matches:
+            id = match['match_id']
+            if id in scraped:
+                continue
+
+            try:
+                if driver is None:
+                    driver = create_driver()
+
+                winner, match_map, player_links = scrape_match(driver, id)
+
+                players_stats = [None]*10
+                for index, link in enumerate(player_links):
+                    profile = cache.get(link)
+                    if profile is None:
+                        profile = scrape_profile(driver, link)
+                        cache.put(link, *profile)
+                    players_stats[index] = player_stats(profile, match_map)
+
+            except Exception as e:
+                metrics.error("match", e)
+                print(f"match {id} skipped ({type(e).__name__}), restarting driver. . .")
+                try:
+                    if driver is not None:
+                        driver.quit()
+                except Exception:
+                    pass
+                driver = None
+                continue
+
+            bias = map_bias.get(match_map)
+            store.append(id, bias, players_stats, winner)
+            scraped.add(id)
+
+            yield id, bias, players_stats, winner
+
+    finally:
+        if driver is not None:
+            driver.quit()
+
+
+# (match_id, map_bias, players_stats, winner) -> (match_id, model input row, winner)
+def feature_stage(records, predictor):
+    for id, bias, players_stats, winner in records:
+        stats = [[float('nan')]*11 if p is None else p for p in players_stats]
+        yield id, predictor.features([stats], [bias if bias is not None else float('nan')]), winner
+
+
+# (match_id, model input row, winner) -> prediction row
+def predict_stage(records, predictor):
+    for id, X, winner in records:
+        if pd.isna(X).any():
+            print(f"match {id} has a team without stats, not scored")
+            continue
+
+        proba = float(predictor.predict_features(X)[0])
+        yield {
+            'match_id': id,
+            'team_1_win': proba,
+            'predicted': 'team_1' if proba >= 0.5 else 'team_2',
+            'winner': winner,
+        }
+
+
+if __name__ == "__main__":
+    predictor = Predictor.load(MODEL_PATH)
+    cache = PlayerCache()
+
+    seen = SeenIndex('data/seen_matches.bin', seed_csvs=['data/matches_pmr_2.csv', 'data/matches_ofc_2.csv'])
+    scraped = SeenIndex('data/seen_stats_pmr.bin', seed_csvs=['data/stats_pmr.csv'])
+    store = open_store('data/stats_pmr', 'data/stats_pmr.csv', seen=scraped)
+
+    sinks = {
+        'pmr': RowSink('data/matches_pmr_2.csv', PMR_COLUMNS, seen=seen),
+        'ofc': RowSink('data/matches_ofc_2.csv', OFC_COLUMNS, seen=seen),
+    }
+    predictions = RowSink(PREDICTIONS_PATH, PREDICTION_COLUMNS, batch_size=1)
+
+    matches = queue.Queue(QUEUE_SIZE)
+    stopping = threading.Event()
+    poller = threading.Thread(target=poll_listing, args=(matches, seen, sinks, stopping), daemon=True)
+    poller.start()
+
+    records = player_stage(queued(matches), cache, store, scraped)
+    records = feature_stage(records, predictor)
+
+    try:
+        for prediction in predict_stage(records, predictor):
+            print(f"{prediction['match_id']} : team_1 {prediction['team_1_win']:.2f} | predicted {prediction['predicted']} | winner {prediction['winner']}")
+            predictions.write(prediction)
+    except KeyboardInterrupt:
+        pass
+
+    # the poller writes to the sinks, so it is stopped before they are closed.
+    # it may be blocked on a full queue, which is emptied until it is gone
+    stopping.set()
+    while poller.is_alive():
+        try:
+            matches.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+    for sink in (*sinks.values(), predictions):
+        sink.close()
+    cache.close()
+
+    print("Session Completed")
@@ -0,0 +1,89 @@
+import sqlite3
+import json
+import time
+
+CACHE_PATH = 'data/player_cache.db'
+
+# how long a scraped profile stays valid, in seconds
+CACHE_TTL = 60 * 60 * 24 * 3
+
+
+# stores every scraped player profile on disk, keyed by profile url
+#   stats = [current_rating, best_rating, kd, hltvr, wr, hs, adr, cs, es]
+#   maps  = {map_title: [win_rate, play_count]}
+class PlayerCache():
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS players ('
+            'url TEXT PRIMARY KEY, '
+            'stats TEXT NOT NULL, '
+            'maps TEXT NOT NULL, '
+            'fetched_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute(
+            'SELECT stats, maps, fetched_at FROM players WHERE url = ?', (player_key(url),)
+        ).fetchone()
+
+        # missing or expired
+        if row is None or time.time() - row[2] > self.ttl:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, url, stats, maps):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?)',
+            (player_key(url), json.dumps(stats), json.dumps(maps), time.time())
+        )
+        self.conn.commit()
+
+    # drops expired entries so the file doesn't grow forever
+    def prune(self):
+        self.conn.execute('DELETE FROM players WHERE fetched_at < ?', (time.time() - self.ttl,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# same player can be linked with or without the tab fragment
+def player_key(url):
+    return url.split('#')[0].rstrip('/')
+
+
+# map bias feature of every map, shared by the selenium and http scrapers
+map_bias = {
+    "de_dust2"   :  0.492,
+    "de_mirage"  :  0.491,
+    "de_inferno" :  0.503,
+    "de_nuke"    :  0.470,
+    "de_vertigo" :  0.478,
+    "de_overpass":  0.482,
+    "de_office"  :  0.542,
+    "de_anubis"  :  0.514,
+    "de_ancient" :  0.497,
+    "de_italy"   :  0.578
+}
+
+
+# MWR / MPR for one map from the cached per-map table
+def map_stats(maps, match_map):
+    play_count = sum(played for _, played in maps.values())
+
+    if match_map not in maps:
+        return 0, 0
+
+    mwr, highest_play_count = maps[match_map]
+    mpr = play_count and highest_play_count / play_count or 0
+
+    return mwr, mpr
@@ -0,0 +1,165 @@
+import sqlite3
+import time
+import datetime as dt
+import pandas as pd
+
+from player_cache import player_key, map_stats
+
+STORE_PATH = 'data/players.db'
+
+# profile stats in the order parse_profile returns them
+STATS = ['current_rating', 'best_rating', 'kd', 'hltvr', 'wr', 'hs', 'adr', 'cs', 'es']
+
+
+# history of every player deep_scraper.py has seen, keyed by the profile id
+# in the player href (https://csstats.gg/player/<id>) instead of the display
+# name, which players change whenever they like
+#
+#   snapshots     one row per profile scrape: the stats at that time
+#   map_records   the maps tab of each snapshot, one row per map
+#   appearances   which players (and which of their snapshots) made up a match
+#
+# (player_id, scraped_at) and match_id are indexed, so the latest or as of a
+# date snapshot of a player and the players of a match are b-tree lookups,
+# O(log n) however many matches are stored
+class PlayerStore():
+    def __init__(self, path=STORE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS snapshots ('
+            'snapshot_id INTEGER PRIMARY KEY, '
+            'player_id INTEGER NOT NULL, '
+            'scraped_at REAL NOT NULL, '
+            'match_id INTEGER, '
+            + ''.join(f'{stat} REAL, ' for stat in STATS) +
+            'link TEXT NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS snapshots_player ON snapshots (player_id, scraped_at);'
+
+            'CREATE TABLE IF NOT EXISTS map_records ('
+            'snapshot_id INTEGER NOT NULL, '
+            'map TEXT NOT NULL, '
+            'win_rate REAL, '
+            'played INTEGER, '
+            'PRIMARY KEY (snapshot_id, map));'
+
+            'CREATE TABLE IF NOT EXISTS appearances ('
+            'match_id INTEGER NOT NULL, '
+            'idx INTEGER NOT NULL, '
+            'player_id INTEGER NOT NULL, '
+            'snapshot_id INTEGER, '
+            'PRIMARY KEY (match_id, idx));'
+            'CREATE INDEX IF NOT EXISTS appearances_player ON appearances (player_id);'
+        )
+        self.conn.commit()
+
+    # -- WRITING -- #
+
+    # a freshly scraped profile, returns its snapshot id
+    def add(self, link, stats, maps, match_id=None, scraped_at=None):
+        cursor = self.conn.execute(
+            f'INSERT INTO snapshots (player_id, scraped_at, match_id, {", ".join(STATS)}, link) '
+            f'VALUES (?, ?, ?, {", ".join("?" * len(STATS))}, ?)',
+            (player_id(link), scraped_at or time.time(), match_id, *stats, player_key(link))
+        )
+        snapshot = cursor.lastrowid
+
+        self.conn.executemany(
+            'INSERT INTO map_records VALUES (?, ?, ?, ?)',
+            [(snapshot, map, win_rate, played) for map, (win_rate, played) in maps.items()]
+        )
+        self.conn.commit()
+        return snapshot
+
+    # player index of a match, with the scraped profile if there is a new one,
+    # otherwise linked to the latest snapshot (a player cache hit)
+    def record(self, match_id, index, link, profile=None):
+        if profile is not None:
+            snapshot = self.add(link, *profile, match_id=match_id)
+        else:
+            snapshot = self.snapshot_id(player_id(link))
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO appearances VALUES (?, ?, ?, ?)',
+            (match_id, index, player_id(link), snapshot)
+        )
+        self.conn.commit()
+
+    # -- LOOKUPS -- #
+
+    def snapshot_id(self, player, when=None):
+        row = self.conn.execute(
+            'SELECT snapshot_id FROM snapshots WHERE player_id = ? AND scraped_at <= ? '
+            'ORDER BY scraped_at DESC LIMIT 1',
+            (player, timestamp(when))
+        ).fetchone()
+        return row[0] if row else None
+
+    # (stats, maps) of a snapshot, the same shape the PlayerCache holds
+    def snapshot(self, snapshot):
+        row = self.conn.execute(
+            f'SELECT {", ".join(STATS)} FROM snapshots WHERE snapshot_id = ?', (snapshot,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        maps = {
+            map: [win_rate, played] for map, win_rate, played in self.conn.execute(
+                'SELECT map, win_rate, played FROM map_records WHERE snapshot_id = ?', (snapshot,)
+            )
+        }
+        return list(row), maps
+
+    # newest profile of a player (a profile id or a link), or None
+    def latest(self, player):
+        return self.as_of(player, None)
+
+    # profile as it was at a date (datetime, pandas timestamp or unix seconds)
+    def as_of(self, player, when):
+        if isinstance(player, str):
+            player = player_id(player)
+        snapshot = self.snapshot_id(player, when)
+        return None if snapshot is None else self.snapshot(snapshot)
+
+    # the 11 deep_scraper player stats for a map, as of a date
+    def player_stats(self, player, match_map, when=None):
+        profile = self.as_of(player, when)
+        if profile is None:
+            return None
+
+        stats, maps = profile
+        return stats + list(map_stats(maps, match_map))
+
+    # {idx: (player_id, (stats, maps))} of the players of a match
+    def match_players(self, match_id):
+        rows = self.conn.execute(
+            'SELECT idx, player_id, snapshot_id FROM appearances WHERE match_id = ? ORDER BY idx', (match_id,)
+        ).fetchall()
+        return {idx: (player, self.snapshot(snapshot)) for idx, player, snapshot in rows}
+
+    # every snapshot of a player as a time series
+    def history(self, player):
+        if isinstance(player, str):
+            player = player_id(player)
+
+        frame = pd.read_sql_query(
+            f'SELECT scraped_at, match_id, {", ".join(STATS)} FROM snapshots WHERE player_id = ? ORDER BY scraped_at',
+            self.conn, params=(player,)
+        )
+        frame['scraped_at'] = pd.to_datetime(frame['scraped_at'], unit='s')
+        return frame
+
+    def close(self):
+        self.conn.close()
+
+
+# profile id from a player link, https://csstats.gg/player/76561198... -> 76561198...
+def player_id(link):
+    return int(player_key(link).split('/player/')[1].split('/')[0])
+
+
+def timestamp(when):
+    if when is None:
+        return float('inf')
+    if isinstance(when, (dt.datetime, pd.Timestamp)):
+        return pd.Timestamp(when).timestamp()
+    return float(when)
@@ -0,0 +1,227 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from collections import deque
+from time import perf_counter
+import numpy as np
+import threading
+import queue
+import json
+import sys
+
+from predictor import Predictor, MODEL_PATH
+from stats_store import open_store, STORE_PATH
+
+# long running prediction service. loads the saved model and the player stats
+# once, then answers
+#
+#   GET /predict?match_id=229412472[,229412306,...]  -> chance of team 1 winning
+#   GET /stats                                      -> p50 / p99 latency
+#
+# requests that arrive together are put in one batch and scored with a single
+# predict_proba call. matches with a team nobody was scraped for can't be
+# scored and come back under 'unscored' with the reason
+#
+# usage: python predict_service.py [port]
+
+PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8050
+
+# longest a request waits for others to join its batch, and the biggest batch
+BATCH_WAIT = 0.002
+MAX_BATCH = 256
+
+# how many request latencies are kept for the percentiles
+LATENCY_WINDOW = 10000
+
+
+# -- BATCHING -- #
+
+class Request():
+    def __init__(self, X):
+        self.X = X
+        self.proba = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher():
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.requests = queue.Queue()
+        self.batches = 0
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # called from the request threads with rows already through
+    # Predictor.features, blocks until the batch is scored. raises when the
+    # batch could not be scored
+    def predict(self, X):
+        request = Request(X)
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.proba
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+
+            # collects whatever else arrives within BATCH_WAIT
+            deadline = perf_counter() + BATCH_WAIT
+            while len(batch) < MAX_BATCH:
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                proba = self.predictor.predict_features(np.concatenate([r.X for r in batch]))
+            except Exception as e:
+                print(f"batch failed ({e})")
+                for r in batch:
+                    r.error = e
+                    r.done.set()
+                self.batches += 1
+                continue
+
+            start = 0
+            for r in batch:
+                r.proba = proba[start:start + len(r.X)]
+                start += len(r.X)
+                r.done.set()
+
+            self.batches += 1
+
+
+# -- SERVICE -- #
+
+class Service():
+    def __init__(self, predictor, store):
+        self.predictor = predictor
+        self.batcher = Batcher(predictor)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.store = store
+        self.lock = threading.Lock()
+        self.reload()
+
+    # player stats stay memory mapped, only the id -> row lookup is built.
+    # the lookup and the arrays it indexes are swapped in as one tuple, so a
+    # request never pairs new rows with the old arrays
+    def reload(self):
+        arrays = self.store.load()
+        rows = {int(id): i for i, id in enumerate(arrays['match_id'])}
+        self.data = (rows, arrays)
+
+    def predict(self, match_ids):
+        start = perf_counter()
+
+        # matches scraped since the last load
+        rows_of, arrays = self.data
+        if any(id not in rows_of for id in match_ids) and len(self.store) != len(rows_of):
+            with self.lock:
+                if len(self.store) != len(self.data[0]):
+                    self.reload()
+                rows_of, arrays = self.data
+
+        found = [id for id in match_ids if id in rows_of]
+        rows = [rows_of[id] for id in found]
+
+        results = []
+        unscored = []
+        if rows:
+            X = self.predictor.features(arrays['stats'][rows], arrays['map_bias'][rows])
+
+            # a team without stats gives a NaN row, which would fail the
+            # whole batch, so it is left out like in pipeline.predict_stage
+            complete = ~np.isnan(X).any(axis=1)
+            unscored = [{'match_id': id, 'error': 'a team has no stats'} for id, ok in zip(found, complete) if not ok]
+            found = [id for id, ok in zip(found, complete) if ok]
+
+            if found:
+                try:
+                    proba = self.batcher.predict(X[complete])
+                except Exception as e:
+                    unscored += [{'match_id': id, 'error': f'scoring failed ({type(e).__name__})'} for id in found]
+                    found, proba = [], []
+
+                for id, p in zip(found, proba):
+                    results.append({
+                        'match_id': id,
+                        'team_1_win': float(p),
+                        'winner': 'team_1' if p >= 0.5 else 'team_2',
+                    })
+
+        self.latencies.append(perf_counter() - start)
+
+        missing = [id for id in match_ids if id not in rows_of]
+        return results, unscored, missing
+
+    def latency(self):
+        if not self.latencies:
+            return {'requests': 0}
+
+        ms = np.array(self.latencies) * 1000
+        return {
+            'requests': len(ms),
+            'batches': self.batcher.batches,
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'model': self.predictor.name,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == '/predict':
+            try:
+                ids = [int(id) for id in parse_qs(url.query)['match_id'][0].split(',')]
+            except (KeyError, ValueError):
+                return self.reply(400, {'error': 'expected /predict?match_id=<id>[,<id>...]'})
+
+            results, unscored, missing = self.service.predict(ids)
+            if not results and not unscored:
+                return self.reply(404, {'error': 'no stats for these matches', 'missing': missing})
+            if not results:
+                return self.reply(422, {'error': 'none of these matches could be scored', 'unscored': unscored, 'missing': missing})
+            return self.reply(200, {'predictions': results, 'unscored': unscored, 'missing': missing})
+
+        if url.path == '/stats':
+            return self.reply(200, self.service.latency())
+
+        self.reply(404, {'error': 'unknown path'})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # keeps the console quiet, every request would print a line otherwise
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    predictor = Predictor.load(MODEL_PATH)
+    store = open_store(STORE_PATH)
+
+    Handler.service = Service(predictor, store)
+    server = ThreadingHTTPServer(('127.0.0.1', PORT), Handler)
+
+    print(f"serving {predictor.name} for {len(store)} matches on http://127.0.0.1:{PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    print(Handler.service.latency())
+    server.server_close()
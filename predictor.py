@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import joblib
+import os
+
+from build_features import FEATURES, raw_features, scale, load_scaler, scaler_path
+
+MODEL_PATH = 'output/best_model.joblib'
+
+
+# a fitted model together with the steps that turn player stats into its input:
+# team differences (build_features.raw_features) -> scaling -> feature columns
+class Predictor():
+    def __init__(self, model, feature_names, mean, std):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.columns = [FEATURES.index(name) for name in self.feature_names]
+        self.mean = np.asarray(mean)
+        self.std = np.asarray(std)
+
+    @property
+    def name(self):
+        return type(self.model).__name__
+
+    # (matches, 10, 11) player stats + (matches,) map bias -> model input
+    def features(self, stats, map_bias):
+        raw = raw_features(np.asarray(stats, dtype=np.float64), np.asarray(map_bias, dtype=np.float64))
+        return scale(raw, self.mean, self.std)[:, self.columns]
+
+    # chance of team 1 winning, one vectorized call for the whole batch
+    def predict_proba(self, stats, map_bias):
+        return self.predict_features(self.features(stats, map_bias))
+
+    # same, for rows already through features()
+    def predict_features(self, X):
+        # models fitted on a dataframe check the column names
+        if hasattr(self.model, 'feature_names_in_'):
+            X = pd.DataFrame(X, columns=self.feature_names)
+
+        return self.model.predict_proba(X)[:, 1]
+
+    def save(self, path=MODEL_PATH):
+        joblib.dump({
+            'model': self.model,
+            'feature_names': self.feature_names,
+            'mean': self.mean,
+            'std': self.std,
+        }, path)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        saved = joblib.load(path)
+        return cls(saved['model'], saved['feature_names'], saved['mean'], saved['std'])
+
+
+# saves a model fitted on the columns of data_path, with the scaling
+# build_features.py wrote next to that dataset. match_ids are the rows of the
+# dataset and have to be the ones the scaling was fitted on, a model is never
+# saved with the scaling of some other data
+def save_model(model, feature_names, data_path, match_ids, path=MODEL_PATH):
+    scaler = scaler_path(data_path)
+    if not os.path.exists(scaler):
+        print(f"no scaling recorded for {data_path} ({scaler} missing), model not saved. "
+              f"train on a build_features.py output to save a model for predict_service.py")
+        return None
+
+    try:
+        mean, std = load_scaler(scaler, match_ids)
+    except ValueError as e:
+        print(f"{e}, model not saved")
+        return None
+
+    predictor = Predictor(model, feature_names, mean, std)
+    predictor.save(path)
+    print(f"saved {predictor.name} to {path}")
+
+    return predictor
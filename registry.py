@@ -0,0 +1,137 @@
+import hashlib
+import json
+import time
+import os
+
+# record of every dataset and output the analysis stages read and write:
+# content hash, row count and schema version of each, and which inputs each
+# stage last ran on. run.py uses it to skip stages whose inputs haven't changed
+#
+# hashes are kept with the size and mtime they were taken at, so an unchanged
+# file is never read again
+
+REGISTRY_PATH = 'output/registry.json'
+
+# bump when the layout of an artifact changes, the stages using it rerun
+SCHEMA_VERSIONS = {
+    'data/matches_premiere.csv': 1,
+    'data/matches_pmr_2.csv': 1,
+    'data/matches_ofc_2.csv': 1,
+    'data/stats_pmr.csv': 1,
+    'data/stats_pmr': 1,
+    'data/final_pmr.csv': 1,
+    'data/built_pmr.csv': 1,
+    'data/built_pmr.scaler.json': 2,
+    'output/point-biserial-output.csv': 2,
+    'output/accuracy-output-1.csv': 1,
+    'output/best_model.joblib': 2,
+}
+
+CHUNK = 1 << 20
+
+
+# -- ARTIFACTS -- #
+
+def files(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name)))
+    return [path]
+
+
+# (size, mtime) of a file or every file of a directory
+def signature(path):
+    return [[f, os.path.getsize(f), os.stat(f).st_mtime_ns] for f in files(path)]
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    for f in files(path):
+        digest.update(os.path.relpath(f, path).encode() if os.path.isdir(path) else b'')
+        with open(f, 'rb') as data:
+            for chunk in iter(lambda: data.read(CHUNK), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_count(path):
+    if os.path.isdir(path):
+        # columnar stats store, one int64 match id per row
+        ids = os.path.join(path, 'match_id.i8')
+        return os.path.getsize(ids) // 8 if os.path.exists(ids) else 0
+
+    if path.endswith('.csv') or path.endswith('.jsonl'):
+        with open(path, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(CHUNK), b''))
+        return lines - 1 if path.endswith('.csv') else lines
+
+    return None
+
+
+class Registry():
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.data = {'artifacts': {}, 'stages': {}}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+
+    # current entry of an artifact, rehashed only if it changed on disk
+    def artifact(self, path):
+        if not os.path.exists(path):
+            return None
+
+        entry = self.data['artifacts'].get(path)
+        sig = signature(path)
+
+        if entry is None or entry['signature'] != sig:
+            entry = self.data['artifacts'][path] = {
+                'signature': sig,
+                'hash': content_hash(path),
+                'rows': row_count(path),
+                'schema': SCHEMA_VERSIONS.get(path, 1),
+                'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+        entry['schema'] = SCHEMA_VERSIONS.get(path, 1)
+        return entry
+
+    # what a stage depends on right now, {path: [hash, schema]}
+    def state(self, paths):
+        state = {}
+        for path in paths:
+            entry = self.artifact(path)
+            state[path] = None if entry is None else [entry['hash'], entry['schema']]
+        return state
+
+    # the reason a stage has to run, or None if its outputs are up to date
+    def stale(self, stage, inputs, outputs):
+        last = self.data['stages'].get(stage)
+        if last is None:
+            return "never run"
+
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            return f"{', '.join(missing)} missing"
+
+        for kind, paths in (('inputs', inputs), ('outputs', outputs)):
+            now = self.state(paths)
+            changed = [path for path in paths if now[path] != last[kind].get(path)]
+            if changed:
+                return f"{', '.join(changed)} changed"
+
+        return None
+
+    def record(self, stage, inputs, outputs, seconds):
+        self.data['stages'][stage] = {
+            'inputs': self.state(inputs),
+            'outputs': self.state(outputs),
+            'seconds': seconds,
+            'ran_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(self.path + '.tmp', self.path)
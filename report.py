@@ -0,0 +1,222 @@
+import numpy as np
+import subprocess
+import html
+import json
+import sys
+import os
+
+from sklearn.metrics import confusion_matrix, roc_curve, auc
+
+# model_testing.py figures without a display. the metrics are computed once in
+# the training run and saved to METRICS_PATH, then a separate process draws
+# them with the Agg backend:
+#
+#   output/report/accuracy.(png|svg)     score bars per model
+#   output/report/confusion.(png|svg)    confusion matrix grid
+#   output/report/roc.(png|svg)          roc curves
+#   output/report/importance.(png|svg)   permutation importance
+#   output/report.html                   all of the above plus the score table
+#
+# usage: python report.py [metrics.json]   redraws the report from saved metrics
+
+METRICS_PATH = 'output/report-metrics.json'
+REPORT_DIR = 'output/report'
+HTML_PATH = 'output/report.html'
+
+FORMATS = ('png', 'svg')
+
+SCORE_NAMES = ['accuracy', 'precision', 'recall', 'f-score', 'auc-roc']
+
+
+# -- METRICS -- #
+
+# everything the figures need, plain lists so it saves as json
+def collect(clf_scores, y_test, importance_df=None):
+    metrics = {'models': [], 'importance': None}
+
+    for clf in clf_scores:
+        fpr, tpr, _ = roc_curve(y_test, clf.y_proba)
+        metrics['models'].append({
+            'name': clf.name,
+            'scores': [float(s) for s in clf.scores()],
+            'balanced_acc': float(clf.acc_bal_score),
+            'log_loss': float(clf.lgl_score),
+            'confusion': confusion_matrix(y_test, clf.y_pred).tolist(),
+            'fpr': fpr.tolist(),
+            'tpr': tpr.tolist(),
+            'roc_auc': float(auc(fpr, tpr)),
+        })
+
+    if importance_df is not None:
+        metrics['importance'] = {
+            'features': [str(c) for c in importance_df.columns],
+            'models': {model: importance_df.loc[model].tolist() for model in importance_df.index},
+        }
+
+    return metrics
+
+
+def save_metrics(metrics, path=METRICS_PATH):
+    with open(path, 'w') as f:
+        json.dump(metrics, f)
+
+
+def load_metrics(path=METRICS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+# -- FIGURES -- #
+
+# figure 1 | accuracy figures
+def accuracy_figure(plt, metrics):
+    fig = plt.figure()
+    models = metrics['models']
+
+    v_count = len(models)
+    x = np.arange(len(SCORE_NAMES))
+    width = 0.2
+
+    for i, model in enumerate(models):
+        plt.bar(x + i * width, model['scores'], width=width, label=model['name'])
+
+    plt.xticks(x + (v_count-1) * width/2, SCORE_NAMES)
+    plt.yticks(list(y/100 for y in range(0,100,5)))
+    plt.legend([model['name'] for model in models], loc = 'lower right')
+
+    return fig
+
+
+# figure 2 | confusion matrix
+def confusion_figure(plt, metrics):
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    models = metrics['models']
+    cols = 2
+    rows = (len(models) + cols - 1) // cols
+    fig, ax = plt.subplots(nrows=rows, ncols=cols, squeeze=False)
+
+    for i, col in enumerate(ax.flat):
+        if i >= len(models):
+            col.axis('off')
+            continue
+        display = ConfusionMatrixDisplay(np.array(models[i]['confusion']), display_labels=["t1_win", "t2_win"])
+        display.plot(ax=col)
+        col.title.set_text(models[i]['name'])
+
+    fig.tight_layout()
+    return fig
+
+
+# figure 3 | ROC curve
+def roc_figure(plt, metrics):
+    fig = plt.figure()
+
+    for model in metrics['models']:
+        plt.plot(model['fpr'], model['tpr'], label=f"{model['name']} (AUC = {model['roc_auc']:.3f})")
+
+    plt.plot([0,1],[0,1], 'k--')
+    plt.xlim([0.0,1.0])
+    plt.ylim([0.0,1.0])
+    plt.xlabel('FPR')
+    plt.ylabel('TPR')
+    plt.legend(loc="lower right")
+
+    return fig
+
+
+# figure 4 | Feature importance based on permutation
+def importance_figure(plt, metrics):
+    importance = metrics['importance']
+    features = importance['features']
+
+    num_features = len(features)
+    bar_width = 0.2
+    y = np.arange(num_features)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Plot each model's importance
+    for i, (model, values) in enumerate(importance['models'].items()):
+        ax.barh(y-0.2 + i * bar_width, values, height=bar_width, label=model)
+
+    ax.set_xlabel('Permutation Importance')
+    ax.set_title('Permutation Importance of Models')
+    ax.set_yticks(y + bar_width / 2)
+    ax.set_yticklabels(features)
+    ax.grid(axis='y')
+    ax.axvline(x=0, color='black')
+    ax.legend(title='Models', loc='lower right')
+
+    fig.tight_layout()
+    return fig
+
+
+FIGURES = {
+    'accuracy': accuracy_figure,
+    'confusion': confusion_figure,
+    'roc': roc_figure,
+    'importance': importance_figure,
+}
+
+
+# draws every figure on the current backend, {name: figure}
+def draw(plt, metrics):
+    return {
+        name: figure(plt, metrics) for name, figure in FIGURES.items()
+        if name != 'importance' or metrics['importance'] is not None
+    }
+
+
+# -- REPORT -- #
+
+def render(metrics_path=METRICS_PATH, report_dir=REPORT_DIR, html_path=HTML_PATH):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    metrics = load_metrics(metrics_path)
+    os.makedirs(report_dir, exist_ok=True)
+
+    for name, fig in draw(plt, metrics).items():
+        for fmt in FORMATS:
+            fig.savefig(os.path.join(report_dir, f"{name}.{fmt}"), dpi=120)
+        plt.close(fig)
+
+    write_html(metrics, report_dir, html_path)
+    return html_path
+
+
+def write_html(metrics, report_dir, html_path):
+    folder = os.path.relpath(report_dir, os.path.dirname(html_path) or '.')
+
+    header = ''.join(f"<th>{name}</th>" for name in ['model'] + SCORE_NAMES + ['balanced acc', 'log loss'])
+    rows = ''.join(
+        "<tr><td>" + html.escape(model['name']) + "</td>"
+        + ''.join(f"<td>{value:.4f}</td>" for value in model['scores'] + [model['balanced_acc'], model['log_loss']])
+        + "</tr>"
+        for model in metrics['models']
+    )
+    figures = ''.join(
+        f'<h2>{name}</h2><img src="{folder}/{name}.svg" alt="{name}">'
+        for name in FIGURES if name != 'importance' or metrics['importance'] is not None
+    )
+
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>model report</title>'
+            '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}'
+            'td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}img{max-width:100%}</style>'
+            '</head><body><h1>model report</h1>'
+            f'<table><tr>{header}</tr>{rows}</table>{figures}</body></html>'
+        )
+
+
+# renders in its own process so the training run doesn't pay for the drawing,
+# wait() on the returned process before relying on the files
+def render_in_background(metrics_path=METRICS_PATH):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), metrics_path])
+
+
+if __name__ == "__main__":
+    print(f"report written to {render(sys.argv[1] if len(sys.argv) > 1 else METRICS_PATH)}")
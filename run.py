@@ -0,0 +1,115 @@
+import subprocess
+import sys
+import os
+from time import perf_counter
+
+from registry import Registry
+from build_features import BUILD_PATH, scaler_path
+from predictor import MODEL_PATH
+
+# runs the analysis stages in dependency order, skipping every stage whose
+# inputs are the same as on its last run and whose outputs
+# are still there untouched
+#
+#   features     build_features.py      stats store -> built_pmr.csv + its scaling
+#   correlation  correlation_testing.py built_pmr.csv -> point-biserial output
+#   training     model_testing.py       built_pmr.csv + its scaling -> accuracy
+#                                       output and the best model
+#
+# a stage depends on the stages writing its inputs, so a new feature build
+# runs correlation and training again. inputs are everything a stage's result
+# depends on: data, the script and the local modules it imports
+#
+# usage: python run.py [stage ...] [--force]
+#   naming stages runs those plus whatever they depend on, --force ignores the registry
+
+# dataset the features stage writes and correlation_testing.py and model_testing.py read
+DATASET = BUILD_PATH
+
+# name -> (command, inputs, outputs), in the order they run. the command is
+# the script and its arguments
+STAGES = {
+    'features': (
+        ['build_features.py'],
+        ['data/stats_pmr.csv', 'data/stats_pmr', 'stats_store.py'],
+        [DATASET, scaler_path(DATASET)],
+    ),
+    'correlation': (
+        ['correlation_testing.py', DATASET],
+        [DATASET],
+        ['output/point-biserial-output.csv'],
+    ),
+    'training': (
+        ['model_testing.py', DATASET],
+        [
+            DATASET,
+            scaler_path(DATASET),
+            'output/feature-selection-output.csv',
+            'evaluation.py',
+            'feature_selection.py',
+            'knn_index.py',
+            'predictor.py',
+            'build_features.py',
+            'report.py',
+        ],
+        ['output/accuracy-output-1.csv', MODEL_PATH],
+    ),
+}
+
+
+# stages producing the inputs of a stage
+def dependencies(name):
+    inputs = set(STAGES[name][1])
+    return [stage for stage, (_, _, outputs) in STAGES.items() if stage != name and inputs & set(outputs)]
+
+
+def with_dependencies(names):
+    wanted = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(dependencies(name))
+    return [name for name in STAGES if name in wanted]
+
+
+def run(names, force=False):
+    registry = Registry()
+
+    for name in with_dependencies(names):
+        command, inputs, outputs = STAGES[name]
+        script = command[0]
+        inputs = inputs + [script]
+
+        reason = "forced" if force else registry.stale(name, inputs, outputs)
+        if reason is None:
+            print(f"{name}: up to date, skipped")
+            continue
+
+        print(f"{name}: running {script} ({reason})")
+        start = perf_counter()
+
+        # figures go to files, nothing waits for a display
+        env = dict(os.environ, MPLBACKEND='Agg')
+        result = subprocess.run([sys.executable] + command, env=env)
+        if result.returncode != 0:
+            print(f"{name}: {script} failed with exit code {result.returncode}, stopping")
+            return result.returncode
+
+        seconds = perf_counter() - start
+        registry.record(name, inputs, outputs, seconds)
+        print(f"{name}: done in {seconds:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+
+    unknown = [arg for arg in args if arg not in STAGES]
+    if unknown:
+        print(f"unknown stages {unknown}, expected any of {list(STAGES)}")
+        sys.exit(2)
+
+    sys.exit(run(args or list(STAGES), force='--force' in sys.argv))
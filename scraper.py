@@ -1,7 +1,3 @@
-from selenium import webdriver
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, NoSuchWindowException
 
 import pandas as pd
@@ -11,193 +7,187 @@ import time
 import datetime as dt
 from collections import deque
 
-LINK = "https://csstats.gg/match"
-PATH = "C:\Program Files (x86)\Devtools\chromedriver-win64\chromedriver.exe" #depends on your system
-
-# -- DATAFRAME SETUP -- #
-
-if os.path.exists('data/matches_pmr_2.csv'):
-    df_matches_pmr = pd.read_csv('data/matches_pmr_2.csv', index_col=0)
-else:
-    df_matches_pmr = pd.DataFrame(
-        columns=[
-            'match_id',
-            'premiere_rating',
-            'date',
-            'map',
-            'team_1',
-            'team_1_score',
-            'team_2',
-            'team_2_score',
-            'KDA'
-            ]
-    )
-
-if os.path.exists('data/matches_ofc_2.csv'):
-    df_matches_ofc = pd.read_csv('data/matches_ofc_2.csv', index_col=0)
-else:
-    df_matches_ofc = pd.DataFrame(
-        columns=[
-            'match_id',
-            'official_rank',
-            'date',
-            'map',
-            'team_1',
-            'team_1_score',
-            'team_2',
-            'team_2_score',
-            'KDA'
-            ]
-    )
-
-# stores last 50 match id's to check for duplicates
-last_50 = []
-last_50.extend(df_matches_pmr.tail(50)['match_id'].to_list())
-last_50.extend(df_matches_ofc.tail(50)['match_id'].to_list())
-print(last_50)
-
-# -- DRIVER SETUP -- #
-options = webdriver.ChromeOptions()
-
-# prevents driver from automaticallty closing the window
-options.add_experimental_option(name="detach", value=True)
-# prevents weird ass info
-options.add_argument('--ignore-certificate-errors')
-options.add_argument('--ignore-ssl-errors')
+import parse_selenium
+import parse_lxml
+from storage import RowSink
+from seen_index import SeenIndex
+from driver_factory import make_driver, accept_cookies
+from metrics import Metrics
+from deep_scraper import StatsQueue
 
-cService = webdriver.ChromeService(executable_path=PATH)
-driver = webdriver.Chrome(options=options, service=cService)
+LINK = "https://csstats.gg/match"
 
-# ensures viewport is same on all devices (namely PCs and laptops)
-driver.maximize_window()
+# "lxml" parses the page html in one pass, "selenium" reads every element through the driver
+BACKEND = "lxml"
+
+# driver_factory profile, "lean" runs headless (stop it with Ctrl+C),
+# "full" opens a window that ends the session when it is closed
+PROFILE = "lean"
+
+# listing timings, errors and rows written, rewritten after every poll
+# (set METRICS_PORT to also serve them on http://127.0.0.1:<port>/metrics)
+METRICS_PATH = 'output/scraper_metrics.prom'
+METRICS_PORT = None
+
+# deep player stats of new matches next to the listing, opt in. every match
+# type in DEEP_QUEUES ('pmr', 'ofc') gets its own StatsQueue (data/stats_pmr,
+# data/stats_ofc) with QUEUE_WORKERS browsers. () = listing only, like before,
+# with the deep stats scraped by running deep_scraper.py
+DEEP_QUEUES = ()
+QUEUE_WORKERS = 2
+
+metrics = Metrics(METRICS_PATH)
+if METRICS_PORT is not None:
+    metrics.serve(METRICS_PORT)
+
+# -- OUTPUT SETUP -- #
+
+# every match id saved so far, in either file
+seen = SeenIndex('data/seen_matches.bin', seed_csvs=['data/matches_pmr_2.csv', 'data/matches_ofc_2.csv'])
+print(f"{len(seen)} matches already saved")
+
+# rows are buffered and appended to the csv files a batch at a time
+sink_pmr = RowSink(
+    'data/matches_pmr_2.csv',
+    columns=[
+        'match_id',
+        'premiere_rating',
+        'date',
+        'map',
+        'team_1',
+        'team_1_score',
+        'team_2',
+        'team_2_score',
+        'KDA'
+        ],
+    seen=seen
+)
+
+sink_ofc = RowSink(
+    'data/matches_ofc_2.csv',
+    columns=[
+        'match_id',
+        'official_rank',
+        'date',
+        'map',
+        'team_1',
+        'team_1_score',
+        'team_2',
+        'team_2_score',
+        'KDA'
+        ],
+    seen=seen
+)
+
+# -- DEEP STATS QUEUES -- #
+queues = {name: StatsQueue(name, workers=QUEUE_WORKERS).start() for name in DEEP_QUEUES}
+if queues:
+    print(' | '.join(f"{name} : {q.pending.qsize()} matches queued" for name, q in queues.items()))
 
-# adds an implicit delay to wait for loading, pop-ups, etc
-driver.implicitly_wait(15)
+# -- DRIVER SETUP -- #
+driver = make_driver(PROFILE)
 
 
 # -- RUN -- #
 driver.get(LINK)
 running = True
+reload = False
 
-# handling pop-up with shadow DOM
-shadow_parent = driver.find_element(by=By.CSS_SELECTOR, value='#usercentrics-root')
-outer = driver.execute_script('return arguments[0].shadowRoot', shadow_parent)
-cookie_button = outer.find_element(By.CSS_SELECTOR, "button[data-testid='uc-accept-all-button']")
-cookie_button.click()
+accept_cookies(driver)
 
 while running:
     # break case
     try:
-       # selecting table
-        driver.implicitly_wait(0)
-        table = driver.find_element(by=By.XPATH, value='//table[@class="table table-striped"]')
-
-        # selecting rows
-        rows = table.find_elements(by=By.TAG_NAME, value='tr')
-
-        # selecting columns/cells
-        for row in rows[1:]: # skips header row
-            cells = row.find_elements(By.TAG_NAME, value='td')
-            is_premiere = True
-
-            # match_id
-            match_id = int(row.get_attribute('onclick').split('/')[2][:-1])
-            if match_id in last_50:
-                continue # ignore duplicate matches
-                print("Duplicate e")
+        with metrics.timer("listing", "load"):
+            if reload:
+                driver.refresh()
+            page = parse_selenium.page_source(driver, parse_selenium.LISTING_WAIT)
+        reload = True
+
+        # parsing the match table
+        with metrics.timer("listing", "parse"):
+            if BACKEND == "lxml":
+                matches = parse_lxml.parse_listing(page, skip=lambda id: id in seen)
             else:
-                last_50.append(match_id)
-                print(last_50.pop(0))
-            
-            # premiere rating / official rank / none
-            if len(cells[1].find_elements(By.TAG_NAME, 'div')) > 0:
-                rating = int(cells[1].find_element(By.TAG_NAME, 'span').text.replace(',',''))
+                matches = parse_selenium.parse_listing(driver, skip=lambda id: id in seen)
+        metrics.parsed("listing", sum(len(match) for match in matches))
 
-            elif len(cells[1].find_elements(By.TAG_NAME, 'img')) > 0:
-                is_premiere = False
-                rank = cells[1].find_element(By.TAG_NAME, 'img').get_attribute('title')
+        write_start = time.perf_counter()
 
-            else: # ignore all non-competitive matches
-                continue
+        for match in matches:
+            seen.add(match['match_id'])
 
             # date
             date = pd.to_datetime('now')
-            # map
-            try:
-                match_map = cells[4].find_element(By.TAG_NAME, 'img').get_attribute('title')
-            except NoSuchElementException:
-                match_map = cells[4].text
-
-            # teams
-            arr_t1 = []
-            elm_c5 = cells[5].find_elements(By.TAG_NAME, 'img')
-            for elm in elm_c5:
-                arr_t1.append(elm.get_attribute('title'))
-
-            arr_t2 = []
-            elm_c8 = cells[8].find_elements(By.TAG_NAME, 'img')
-            for elm in elm_c8:
-                arr_t2.append(elm.get_attribute('title'))
-
-            # scores
-            score_t1 = cells[6].text
-            score_t2 = cells[7].text
-
-            # KDA
-            match_kda = []
-            match_kda.append(cells[9].text)
-            match_kda.append(cells[10].text)
-            match_kda.append(cells[11].text)
-
-            # appending to dataframe
-            if(is_premiere):
+
+            # appending to output
+            if 'premiere_rating' in match:
                 new_df_row = {
-                    'match_id':match_id,
-                    'premiere_rating':rating,
+                    'match_id':match['match_id'],
+                    'premiere_rating':match['premiere_rating'],
                     'date':date,
-                    'map':match_map,
-                    'team_1':arr_t1,
-                    'team_1_score':score_t1,
-                    'team_2':arr_t2,
-                    'team_2_score':score_t2,
-                    'KDA':match_kda
+                    'map':match['map'],
+                    'team_1':match['team_1'],
+                    'team_1_score':match['team_1_score'],
+                    'team_2':match['team_2'],
+                    'team_2_score':match['team_2_score'],
+                    'KDA':match['KDA']
                 }
 
-                df_matches_pmr = df_matches_pmr._append(new_df_row, ignore_index=True)
+                sink_pmr.write(new_df_row)
+                metrics.rows("matches_pmr")
+                match_type = 'pmr'
 
             else:
                 new_df_row = {
-                    'match_id':match_id,
-                    'official_rank':rank,
+                    'match_id':match['match_id'],
+                    'official_rank':match['official_rank'],
                     'date':date,
-                    'map':match_map,
-                    'team_1':arr_t1,
-                    'team_1_score':score_t1,
-                    'team_2':arr_t2,
-                    'team_2_score':score_t2,
-                    'KDA':match_kda
+                    'map':match['map'],
+                    'team_1':match['team_1'],
+                    'team_1_score':match['team_1_score'],
+                    'team_2':match['team_2'],
+                    'team_2_score':match['team_2_score'],
+                    'KDA':match['KDA']
                 }
 
-                df_matches_ofc = df_matches_ofc._append(new_df_row, ignore_index=True)
+                sink_ofc.write(new_df_row)
+                metrics.rows("matches_ofc")
+                match_type = 'ofc'
+
+            if match_type in queues:
+                queues[match_type].put(match['match_id'])
+
+        metrics.observe("listing", "write", time.perf_counter() - write_start)
+        metrics.write()
 
         print("reloading page. . .")
         time.sleep(5)
-        driver.refresh() 
 
-    except NoSuchWindowException:
+    except (NoSuchWindowException, KeyboardInterrupt):
         running = False
         print("Closing Session")
         time.sleep(5)
         break
+
+    except Exception as e:
+        metrics.error("listing", e)
+        print(f"listing failed ({type(e).__name__}), reloading page. . .")
+        time.sleep(5)
         
     
 
-print(df_matches_pmr.head())
-
 driver.quit()
 
-# saves result to df
-df_matches_pmr.to_csv('data/matches_pmr_2.csv')
-df_matches_ofc.to_csv('data/matches_ofc_2.csv')
+# writes whatever is still buffered
+sink_pmr.close()
+sink_ofc.close()
+
+metrics.write()
+
+for name, q in queues.items():
+    print(f"finishing the {name} deep stats in progress. . .")
+    q.stop()
 
+print(f"rows saved | premiere : {len(sink_pmr)} | official : {len(sink_ofc)}")
 print("Session Completed")
\ No newline at end of file
@@ -0,0 +1,46 @@
+import numpy as np
+import os
+
+from match_loader import match_ids
+
+# index of match ids that are already saved, shared by the scrapers.
+# on disk it is a flat file of little endian int64 ids that only ever gets
+# appended to, so it loads with a single np.fromfile and never needs rewriting.
+# in memory it is a set, so checking an id is O(1) however many there are
+#
+# ids are only persisted once the rows they belong to are on disk (RowSink
+# calls persist() after each flush), so the file never claims a match that a
+# crash lost
+class SeenIndex():
+    def __init__(self, path, seed_csvs=()):
+        self.path = path
+
+        if not os.path.exists(path):
+            self.build(seed_csvs)
+
+        self.ids = set(np.fromfile(path, dtype='<i8').tolist())
+
+    # first run, takes the ids from the csv files written so far
+    def build(self, seed_csvs):
+        ids = [match_ids(csv).astype('<i8') for csv in seed_csvs if os.path.exists(csv)]
+        ids = np.unique(np.concatenate(ids)) if ids else np.empty(0, dtype='<i8')
+        ids.astype('<i8').tofile(self.path)
+
+    def __contains__(self, id):
+        return id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    # marks an id as seen for this session only
+    def add(self, id):
+        self.ids.add(int(id))
+
+    # appends ids whose rows have been written to disk
+    def persist(self, ids):
+        if not ids:
+            return
+
+        self.ids.update(int(id) for id in ids)
+        with open(self.path, 'ab') as f:
+            np.asarray(ids, dtype='<i8').tofile(f)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import ast
+import os
+import sys
+
+STORE_PATH = 'data/stats_pmr'
+
+# player stat vector, same order deep_scraper builds it in
+STATS = ['current_rating', 'best_rating', 'kd', 'hltvr', 'wr', 'hs', 'adr', 'cs', 'es', 'mwr', 'mpr']
+PLAYERS = ['t1_p1', 't1_p2', 't1_p3', 't1_p4', 't1_p5', 't2_p1', 't2_p2', 't2_p3', 't2_p4', 't2_p5']
+
+# one flat binary file per column, each only ever appended to
+#   stats.f8     float64 (matches, 10, 11), NaN for a missing player
+#   map_bias.f8  float64 (matches,)
+#   winner.i1    int8    (matches,), 1 = team_1 won, 0 = team_2 won
+#   match_id.i8  int64   (matches,), written last so it doubles as the row count
+COLUMNS = {
+    'stats': ('<f8', (len(PLAYERS), len(STATS))),
+    'map_bias': ('<f8', ()),
+    'winner': ('i1', ()),
+    'match_id': ('<i8', ()),
+}
+FILES = {'stats': 'stats.f8', 'map_bias': 'map_bias.f8', 'winner': 'winner.i1', 'match_id': 'match_id.i8'}
+
+
+# columnar replacement for data/stats_pmr.csv. loading is a memory map of the
+# files above, no string parsing, so reading it costs the same however many
+# matches there are
+class StatsStore():
+    def __init__(self, path=STORE_PATH, seen=None):
+        self.path = path
+        self.seen = seen
+
+        os.makedirs(path, exist_ok=True)
+        self.repair()
+
+    def file(self, column):
+        return os.path.join(self.path, FILES[column])
+
+    def itemsize(self, column):
+        dtype, shape = COLUMNS[column]
+        return np.dtype(dtype).itemsize * int(np.prod(shape))
+
+    def __len__(self):
+        path = self.file('match_id')
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    # a crash halfway through append() can leave some columns one row longer,
+    # match_id is written last so everything is cut back to its length
+    def repair(self):
+        n = len(self)
+        for column in COLUMNS:
+            path = self.file(column)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != n * self.itemsize(column):
+                with open(path, 'r+b') as f:
+                    f.truncate(n * self.itemsize(column))
+
+    # players_stats is the 10 player lists from deep_scraper (None if missing)
+    def append(self, match_id, map_bias, players_stats, winner):
+        stats = np.full((len(PLAYERS), len(STATS)), np.nan)
+        for i, player in enumerate(players_stats):
+            if player is not None:
+                stats[i] = player
+
+        values = {
+            'stats': stats,
+            'map_bias': np.nan if map_bias is None else map_bias,
+            'winner': 1 if winner in ('team_1', 1) else 0,
+            'match_id': match_id,
+        }
+
+        for column in COLUMNS:
+            with open(self.file(column), 'ab') as f:
+                np.asarray(values[column], dtype=COLUMNS[column][0]).tofile(f)
+
+        if self.seen is not None:
+            self.seen.persist([match_id])
+
+    # dict of (memory mapped) arrays, all with the same first dimension
+    def load(self, mmap=True):
+        n = len(self)
+        arrays = {}
+
+        for column, (dtype, shape) in COLUMNS.items():
+            if n == 0:
+                arrays[column] = np.empty((0,) + shape, dtype=dtype)
+            elif mmap:
+                arrays[column] = np.memmap(self.file(column), dtype=dtype, mode='r', shape=(n,) + shape)
+            else:
+                arrays[column] = np.fromfile(self.file(column), dtype=dtype).reshape((n,) + shape)
+
+        return arrays
+
+    # converts an old stats_pmr.csv, the only place list strings still get parsed
+    def import_csv(self, csv_path):
+        df = pd.read_csv(csv_path, index_col=0)
+
+        for row in df.itertuples(index=False):
+            row = row._asdict()
+            players = [ast.literal_eval(row[p]) if isinstance(row[p], str) else None for p in PLAYERS]
+            bias = row['map_bias'] if pd.notna(row['map_bias']) else None
+            self.append(row['match_id'], bias, players, row['winner'])
+
+        return len(df)
+
+    # same layout as the old csv, for looking at the data by hand
+    def to_frame(self):
+        arrays = self.load(mmap=False)
+        df = pd.DataFrame({'match_id': arrays['match_id'], 'map_bias': arrays['map_bias']})
+        for i, player in enumerate(PLAYERS):
+            df[player] = [None if np.isnan(s).all() else s.tolist() for s in arrays['stats'][:, i]]
+        df['winner'] = np.where(arrays['winner'] == 1, 'team_1', 'team_2')
+        return df
+
+
+# opens the store, filling it from the old csv file the first time
+def open_store(path=STORE_PATH, csv_path='data/stats_pmr.csv', seen=None):
+    store = StatsStore(path, seen=seen)
+    if len(store) == 0 and os.path.exists(csv_path):
+        print(f"converted {store.import_csv(csv_path)} rows from {csv_path}")
+    return store
+
+
+if __name__ == "__main__":
+    # python stats_store.py [csv_path] [store_path]
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'data/stats_pmr.csv'
+    store_path = sys.argv[2] if len(sys.argv) > 2 else STORE_PATH
+
+    store = open_store(store_path, csv_path)
+    print(f"{len(store)} matches in {store_path}")
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+
+# rows buffered in memory before they are appended to disk
+BATCH_SIZE = 25
+
+# columns of the match listing files
+PMR_COLUMNS = ['match_id', 'premiere_rating', 'date', 'map', 'team_1', 'team_1_score', 'team_2', 'team_2_score', 'KDA']
+OFC_COLUMNS = ['match_id', 'official_rank', 'date', 'map', 'team_1', 'team_1_score', 'team_2', 'team_2_score', 'KDA']
+
+
+# append-only output file for the scrapers. rows are kept in a plain list and
+# written a batch at a time, so writing a row costs the same no matter how big
+# the file already is, and a crash loses at most the rows of one batch
+#
+#   .csv   - same layout pandas writes (leading index column), so the files
+#            can still be read with pd.read_csv(path, index_col=0)
+#   .jsonl - one json object per row
+#
+# if a SeenIndex is given, the match ids of every flushed batch are persisted
+# to it once the rows are safely on disk
+class RowSink():
+    def __init__(self, path, columns, batch_size=BATCH_SIZE, seen=None):
+        self.path = path
+        self.columns = columns
+        self.batch_size = batch_size
+        self.seen = seen
+        self.jsonl = path.endswith('.jsonl')
+
+        self.rows = []
+        self.written = count_rows(path, header=not self.jsonl)
+
+    def write(self, row):
+        self.rows.append([row.get(column) for column in self.columns])
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        new = not os.path.exists(self.path)
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            if self.jsonl:
+                for values in self.rows:
+                    f.write(json.dumps(dict(zip(self.columns, values)), default=str, ensure_ascii=False) + '\n')
+            else:
+                writer = csv.writer(f, lineterminator='\n')
+                if new:
+                    writer.writerow([''] + self.columns)
+                for i, values in enumerate(self.rows):
+                    writer.writerow([self.written + i] + values)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self.seen is not None:
+            id_col = self.columns.index('match_id')
+            self.seen.persist([values[id_col] for values in self.rows])
+
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+    def __len__(self):
+        return self.written + len(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# rows already in a file, read once when the sink is opened
+def count_rows(path, header=True):
+    if not os.path.exists(path):
+        return 0
+
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+
+    return max(lines - header, 0)
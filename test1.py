@@ -1,17 +1,12 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 import time
 
-website = "https://csstats.gg"
-path = "C:\Program Files (x86)\Devtools\chromedriver-win64\chromedriver.exe"
+from driver_factory import make_driver, accept_cookies, SITE
 
-options = webdriver.ChromeOptions()
-options.add_experimental_option(name="detach", value=True)
+website = SITE
 
-cService = webdriver.ChromeService(executable_path=path)
-driver = webdriver.Chrome(options=options, service=cService)
-driver.maximize_window()
-driver.implicitly_wait(3)
+# clicks through the menus, so it keeps the visible window and the implicit wait
+driver = make_driver("full", implicit_wait=3)
 
 # run
 driver.get(website)
@@ -24,12 +19,10 @@ all_matches_link = driver.find_element(by=By.XPATH, value='//a[@href="https://cs
 all_matches_link.click()
 
 # cookies popup
-shadow_parent = driver.find_element(By.CSS_SELECTOR, '#usercentrics-root')
-outer = driver.execute_script('return arguments[0].shadowRoot', shadow_parent)
-outer.find_element(By.CSS_SELECTOR, "button[data-testid='uc-accept-all-button']").click()
+accept_cookies(driver)
 
 # refresh page
 driver.refresh()
 
 # quit
-driver.quit()
\ No newline at end of file
+driver.quit()
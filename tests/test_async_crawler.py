@@ -0,0 +1,93 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import asyncio
+import numpy as np
+import pytest
+
+import async_crawler
+from seen_index import SeenIndex
+from stats_store import StatsStore
+from conftest import fixture
+
+MATCH_ID = 224638109
+
+
+# replays the fixture pages, {path: (status, html)}
+def serve(pages):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = pages.get(self.path, (404, ''))
+            data = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def site(profile_page, player_status=200):
+    pages = {
+        '/match': (200, fixture('listing.html')),
+        f'/match/{MATCH_ID}': (200, fixture('match.html')),
+    }
+    for player in range(1, 11):
+        pages[f'/player/765611980000000{player:02d}'] = (player_status, profile_page)
+    return pages
+
+
+# profile with the maps tab rendered into it, like a server side render would
+def rendered_profile():
+    return fixture('profile.html').replace('</body>', fixture('maps.html').split('<body>')[1].split('</body>')[0] + '</body>')
+
+
+def crawl(tmp_path, monkeypatch, pages):
+    server = serve(pages)
+    monkeypatch.setattr(async_crawler, 'POLLS', 1)
+    monkeypatch.setattr(async_crawler, 'POLL_INTERVAL', 0)
+    monkeypatch.setattr(async_crawler, 'RETRIES', 1)
+    monkeypatch.setattr(async_crawler, 'RATE', 1000)
+    for name in ('PMR_PATH', 'OFC_PATH', 'STATS_PATH', 'STORE_PATH', 'SEEN_PATH', 'SCRAPED_PATH'):
+        monkeypatch.setattr(async_crawler, name, str(tmp_path / name.lower()))
+
+    try:
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        asyncio.run(async_crawler.main(base_url, cache_path=str(tmp_path / 'cache.db')))
+    finally:
+        server.shutdown()
+
+    return StatsStore(str(tmp_path / 'store_path')), SeenIndex(str(tmp_path / 'scraped_path'))
+
+
+def test_replay_saves_resolved_match(tmp_path, monkeypatch):
+    store, scraped = crawl(tmp_path, monkeypatch, site(rendered_profile()))
+
+    arrays = store.load(mmap=False)
+    assert arrays['match_id'].tolist() == [MATCH_ID]
+    assert arrays['winner'].tolist() == [0]
+
+    # 9 players on the scoreboard, the one without a profile link stays NaN
+    players = ~np.isnan(arrays['stats'][0]).all(axis=1)
+    assert players.sum() == 9
+    assert MATCH_ID in scraped
+
+    # both listing rows were saved
+    assert (tmp_path / 'pmr_path').read_text().count('\n') == 2
+    assert (tmp_path / 'ofc_path').read_text().count('\n') == 2
+
+
+@pytest.mark.parametrize('profile_page, status', [
+    (fixture('profile.html'), 200), # maps tab not in the raw html
+    (rendered_profile(), 403),      # site refuses plain http clients
+])
+def test_unresolved_players_leave_match_unsaved(tmp_path, monkeypatch, profile_page, status):
+    store, scraped = crawl(tmp_path, monkeypatch, site(profile_page, status))
+
+    assert len(store) == 0
+    assert MATCH_ID not in scraped
@@ -0,0 +1,15 @@
+import pandas as pd
+import os
+
+import benchmark
+
+
+# the shipped pages parse to the hand checked golden output
+def test_shipped_pages_match_golden(monkeypatch):
+    monkeypatch.setitem(benchmark.REPEAT, 'lxml', 1)
+    path = benchmark.SHIPPED_PATH
+    output, _ = benchmark.run_lxml(path, benchmark.load_manifest(path))
+
+    golden = pd.read_csv(os.path.join(path, benchmark.GOLDEN))
+    assert len(golden) == 6
+    assert not any(benchmark.compare(output, golden).values())
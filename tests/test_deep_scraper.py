@@ -0,0 +1,42 @@
+import deep_scraper
+from crawl_journal import CrawlJournal, MAX_RETRIES
+from player_cache import PlayerCache
+from player_store import PlayerStore
+from metrics import Metrics
+
+MATCH_ID = 224638109
+LINKS = ['https://csstats.gg/player/76561198000000001', 'https://csstats.gg/player/76561198000000002']
+
+
+# journal that remembers which tasks were counted as failed
+class Journal(CrawlJournal):
+    def __init__(self, path):
+        super().__init__(path)
+        self.failures = []
+
+    def failed(self, task):
+        self.failures.append(task[0])
+        return super().failed(task)
+
+
+def test_driver_failure_on_player_task_is_retried_per_page(tmp_path, monkeypatch):
+    def create_driver():
+        raise RuntimeError("browser did not start")
+
+    monkeypatch.setattr(deep_scraper, 'create_driver', create_driver)
+    monkeypatch.setattr(deep_scraper, 'backoff', lambda attempts: 0)
+    monkeypatch.setattr(deep_scraper, 'metrics', Metrics())
+
+    # scoreboard already journaled, so only player tasks are handed out
+    journal = Journal(str(tmp_path / 'journal.db'))
+    journal.save_match(MATCH_ID, 'team_1', 'de_mirage', LINKS)
+    cache = PlayerCache(str(tmp_path / 'cache.db'))
+    players = PlayerStore(str(tmp_path / 'players.db'))
+
+    rows = []
+    deep_scraper.scrape_all([MATCH_ID], lambda *row: rows.append(row), cache, journal, players, workers=2)
+
+    # the failures are counted on the profile page, both players are given up on
+    assert set(journal.failures) == {"profile"}
+    assert len(journal.failures) == 2 * MAX_RETRIES
+    assert rows == [(MATCH_ID, 'team_1', 'de_mirage', [None]*10)]
@@ -0,0 +1,98 @@
+import pytest
+from lxml import html
+
+import parse_lxml
+from conftest import fixture
+
+
+# -- TEXT -- #
+
+def test_text_skips_hidden_elements_and_collapses_whitespace():
+    el = html.fromstring('<td> 13 <span style="display: none">x</span><script>var a;</script>\n <b>of</b> <i hidden>y</i>20 </td>')
+    assert parse_lxml.text(el) == '13 of 20'
+
+
+def test_text_of_hidden_element_is_empty():
+    assert parse_lxml.text(html.fromstring('<div style="visibility:hidden">secret</div>')) == ''
+
+
+# -- MATCH LISTING -- #
+
+def test_parse_listing():
+    matches = parse_lxml.parse_listing(fixture('listing.html'))
+
+    # the unranked match is left out
+    assert [m['match_id'] for m in matches] == [224638109, 224638069]
+
+    premiere, official = matches
+    assert premiere == {
+        'match_id': 224638109,
+        'premiere_rating': 15230,
+        'map': 'de_mirage',
+        'team_1': ['alpha', 'bravo', 'charlie', 'delta', 'echo'],
+        'team_2': ['foxtrot', 'golf', 'hotel', 'india', 'juliet'],
+        'team_1_score': '13',
+        'team_2_score': '9',
+        'KDA': ['21', '17', '4'],
+    }
+
+    assert official['official_rank'] == 'Gold Nova Master'
+    assert 'premiere_rating' not in official
+    # no map image, the cell text is used
+    assert official['map'] == 'de_anubis'
+    assert official['team_1'] == ['kilo', 'lima']
+
+
+def test_parse_listing_skip():
+    matches = parse_lxml.parse_listing(fixture('listing.html'), skip=lambda id: id == 224638109)
+    assert [m['match_id'] for m in matches] == [224638069]
+
+
+# -- MATCH PAGE -- #
+
+def test_parse_match():
+    winner, match_map, links = parse_lxml.parse_match(fixture('match.html'))
+
+    assert winner == 'team_2'
+    assert match_map == 'de_mirage'
+
+    # relative links resolved, the player without a profile is left out,
+    # only the first table is the scoreboard
+    assert len(links) == 9
+    assert links[0] == 'https://csstats.gg/player/76561198000000001'
+    assert links[2] == 'https://csstats.gg/player/76561198000000003'
+    assert links[-1] == 'https://csstats.gg/player/76561198000000010'
+    assert 'https://csstats.gg/player/1' not in links
+
+
+# -- PLAYER PROFILE -- #
+
+def test_parse_profile():
+    stats = parse_lxml.parse_profile(fixture('profile.html'))
+
+    assert stats[:2] == [15230, 18001]
+    assert stats[2:] == pytest.approx([1.12, 1.05, 0.55, 0.48, 0.852, 0.33, 0.51])
+
+
+def test_parse_profile_without_premier_rank():
+    page = fixture('profile.html').replace('title="Premier"', 'title="Competitive"')
+    assert parse_lxml.parse_profile(page)[:2] == [0, 0]
+
+
+def test_parse_profile_missing_block_raises():
+    with pytest.raises(LookupError):
+        parse_lxml.parse_profile('<html><body><div class="col-sm-8"></div></body></html>')
+
+
+# -- MAPS TAB -- #
+
+def test_parse_maps():
+    assert parse_lxml.parse_maps(fixture('maps.html')) == {
+        'de_mirage': [0.6, 42],
+        'de_anubis': [0.45, 20],
+    }
+
+
+def test_parse_maps_without_current_tab():
+    page = fixture('maps.html').replace('content-tab current-tab', 'content-tab')
+    assert parse_lxml.parse_maps(page) == {}